@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Facility,Turf,FieldSize,TurfSlot,TurfRating,SwimmingSlot,BadmintonSlot,SwimmingSession,Sports
+from .models import Facility,Turf,FieldSize,TurfSlot,TurfRating,SwimmingSlot,BadmintonSlot,SwimmingSession,Sports,SwimmingOccupancy,OpeningHours
 # Register your models here.
 admin.site.register(Facility)
 admin.site.register(Turf)
@@ -9,4 +9,24 @@ admin.site.register(FieldSize)
 admin.site.register(TurfRating)
 admin.site.register(BadmintonSlot)
 admin.site.register(TurfSlot)
-admin.site.register(Sports)
\ No newline at end of file
+admin.site.register(Sports)
+admin.site.register(OpeningHours)
+
+
+@admin.register(SwimmingOccupancy)
+class SwimmingOccupancyAdmin(admin.ModelAdmin):
+    """
+    Occupancy counters are maintained by SwimmingSlot writes; editing them here
+    would let a session be overbooked, so the admin only shows them.
+    """
+    list_display = ('session', 'date', 'occupied')
+    list_filter = ('date',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TurfConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Turf'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from Turf_management.metrics import install_query_recorder
+        from . import signals  # noqa: F401
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import TurfSlot, BadmintonSlot, SwimmingSession
+from .slot_index import interval_mask
+
+
+def availability_cache_key(turf_id, date):
+    return f"turf-availability:v2:{int(turf_id)}:{date}"
+
+
+def invalidate_availability(turf_id, date):
+    cache.delete(availability_cache_key(turf_id, date))
+
+
+def _hhmm(value):
+    return value.strftime("%H:%M")
+
+
+def _group(slots):
+    return {
+        str(field_size_id): sorted(intervals, key=lambda slot: (slot[0], slot[1]))
+        for field_size_id, intervals in slots.items()
+    }
+
+
+def _load_slots(turf_id, dates):
+    """
+    Booked intervals and open generated slots per date and field size, one query per
+    table. Open slots overlapping a booking of the same sport are left out.
+    """
+    booked = {date: defaultdict(list) for date in dates}
+    generated = {date: defaultdict(list) for date in dates}
+    turf_slots = TurfSlot.objects.filter(turf_id=turf_id, date__in=dates).values_list(
+        'id', 'date', 'field_size_id', 'sports', 'start_time', 'end_time', 'is_available'
+    )
+    badminton_slots = BadmintonSlot.objects.filter(turf_id=turf_id, date__in=dates).values_list(
+        'id', 'date', 'field_size_id', 'start_time', 'end_time', 'is_available'
+    )
+    rows = [*turf_slots, *((slot_id, date, field_size_id, 'Badminton', start_time, end_time, is_available)
+                           for slot_id, date, field_size_id, start_time, end_time, is_available in badminton_slots)]
+
+    masks = defaultdict(int)
+    for slot_id, date, field_size_id, sports, start_time, end_time, is_available in rows:
+        if not is_available:
+            booked[date][field_size_id].append([_hhmm(start_time), _hhmm(end_time), sports, slot_id])
+            masks[(date, field_size_id, sports)] |= interval_mask(start_time, end_time)
+    for slot_id, date, field_size_id, sports, start_time, end_time, is_available in rows:
+        if is_available and not masks[(date, field_size_id, sports)] & interval_mask(start_time, end_time):
+            generated[date][field_size_id].append([_hhmm(start_time), _hhmm(end_time), sports, slot_id])
+
+    return {date: {'booked': _group(booked[date]), 'open': _group(generated[date])} for date in dates}
+
+
+def availability_grid(turf_id, start_date, days, field_size_id=None):
+    """
+    Booked intervals and open (bookable by slot_id) slots per field size for each
+    day in the range, plus remaining swimming capacity per session. Each (turf, date)
+    is cached until a slot on it changes; dates missing from the cache are loaded
+    together. Intervals are [start, end, sports, slot_id].
+    """
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    keys = {availability_cache_key(turf_id, date): date for date in dates}
+    cached = cache.get_many(keys)
+    slots = {keys[key]: value for key, value in cached.items()}
+
+    missing = [date for date in dates if date not in slots]
+    if missing:
+        loaded = _load_slots(turf_id, missing)
+        cache.set_many(
+            {availability_cache_key(turf_id, date): value for date, value in loaded.items()},
+            settings.AVAILABILITY_CACHE_TIMEOUT,
+        )
+        slots.update(loaded)
+
+    # Swimming capacity is per session, not per turf; it comes from the occupancy counters
+    sessions = list(SwimmingSession.objects.values_list('id', 'start_time', 'end_time'))
+    remaining = SwimmingSession.objects.remaining_capacity_by_date(dates[0], dates[-1])
+
+    result = {}
+    for date in dates:
+        booked, generated = slots[date]['booked'], slots[date]['open']
+        if field_size_id is not None:
+            booked = {key: value for key, value in booked.items() if key == str(field_size_id)}
+            generated = {key: value for key, value in generated.items() if key == str(field_size_id)}
+        result[date.isoformat()] = {
+            'booked': booked,
+            'open': generated,
+            'swimming': [
+                [session_id, _hhmm(start_time), _hhmm(end_time), max(remaining.get((session_id, date), 0), 0)]
+                for session_id, start_time, end_time in sessions
+            ],
+        }
+    return result
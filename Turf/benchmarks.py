@@ -0,0 +1,129 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks run against a throwaway copy of the configured database (created
+the same way the test runner does it), never against the real data.
+"""
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import connections
+from django.db.models import Sum
+from rest_framework.authtoken.models import Token
+
+from User.models import UserModel
+from .models import Turf, FieldSize, TurfSlot, BadmintonSlot, SwimmingSlot, SwimmingSession, SwimmingOccupancy
+
+# Sockets driven in-process do not need (or have) a Redis server
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """
+    Create a fresh test database for the default alias and drop it afterwards.
+    SQLite gets a temporary file instead of the shared in-memory database so
+    that several threads can write to it.
+    """
+    connection = connections['default']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    tmpdir = None
+    if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+        tmpdir = tempfile.mkdtemp(prefix='turf-bench-')
+        test_settings['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity)
+        if tmpdir:
+            test_settings.pop('NAME', None)
+            os.rmdir(tmpdir)
+
+
+def make_users(count, prefix='019'):
+    users = [UserModel(phone_number=f"{prefix}{i:08d}", is_active=True) for i in range(count)]
+    UserModel.objects.bulk_create(users)
+    return list(UserModel.objects.filter(phone_number__startswith=prefix).order_by('id'))
+
+
+def make_turf(field_sizes=1):
+    turf = Turf.objects.create(name='Benchmark Turf', location='Benchmark', image='turf_images/bench.jpg')
+    sizes = [FieldSize.objects.create(name=f"Field {i + 1}") for i in range(field_sizes)]
+    return turf, sizes
+
+
+def future_date(days=30):
+    return date.today() + timedelta(days=days)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """
+    Throughput and latency percentiles (in milliseconds) for a list of latencies in seconds.
+    """
+    return {
+        'count': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def make_tokens(users):
+    """
+    Auth tokens for the users, keyed by user id (bulk_create skips Token.save(), so keys are generated here).
+    """
+    tokens = [Token(user=user, key=Token.generate_key()) for user in users]
+    Token.objects.bulk_create(tokens)
+    return {token.user_id: token.key for token in tokens}
+
+
+def count_double_bookings():
+    """
+    Booked TurfSlot/BadmintonSlot rows that overlap an earlier booking of the same
+    turf, field size, date (and sport for turf slots).
+    """
+    overlaps = 0
+    for model, extra in ((TurfSlot, ['sports']), (BadmintonSlot, [])):
+        rows = model.objects.filter(is_available=False).order_by(
+            'turf_id', 'field_size_id', 'date', *extra, 'start_time'
+        ).values_list('turf_id', 'field_size_id', 'date', *extra, 'start_time', 'end_time')
+        previous_key, previous_end = None, None
+        for *key, start_time, end_time in rows:
+            if key == previous_key and start_time < previous_end:
+                overlaps += 1
+                previous_end = max(previous_end, end_time)
+            else:
+                previous_key, previous_end = key, end_time
+    return overlaps
+
+
+def count_capacity_overruns():
+    """
+    (session, date) pairs whose swimming bookings exceed the session capacity, and
+    pairs whose occupancy counter disagrees with the bookings.
+    """
+    booked = (SwimmingSlot.objects.values('session_id', 'date')
+              .annotate(people=Sum('number_of_people')).values_list('session_id', 'date', 'people'))
+    capacity = dict(SwimmingSession.objects.values_list('id', 'capacity'))
+    occupied = {(session_id, day): value for session_id, day, value in
+                SwimmingOccupancy.objects.values_list('session_id', 'date', 'occupied')}
+    overruns = mismatches = 0
+    for session_id, day, people in booked:
+        overruns += people > capacity[session_id]
+        mismatches += occupied.get((session_id, day), 0) != people
+    return overruns, mismatches
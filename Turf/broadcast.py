@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def availability_group(turf_id, date):
+    """
+    Channel-layer group for the availability of one turf on one date.
+    """
+    return f"availability.{int(turf_id)}.{date}"
+
+
+def _hhmm(value):
+    return value[:5] if isinstance(value, str) else value.strftime("%H:%M")
+
+
+def slot_delta(slot, op):
+    """
+    Compact description of a booked or freed TurfSlot, BadmintonSlot or SwimmingSlot.
+    """
+    if hasattr(slot, 'session_id'):
+        return {
+            'op': op,
+            'kind': 'swimming',
+            'slot_id': slot.id,
+            'session_id': slot.session_id,
+            'people': slot.number_of_people,
+        }
+    return {
+        'op': op,
+        'kind': 'turf' if hasattr(slot, 'sports') else 'badminton',
+        'slot_id': slot.id,
+        'field_size_id': slot.field_size_id,
+        'sports': getattr(slot, 'sports', None),
+        'start_time': _hhmm(slot.start_time),
+        'end_time': _hhmm(slot.end_time),
+    }
+
+
+class AvailabilityBroadcaster:
+    """
+    Collects slot changes per (turf, date) group and sends them as one event per
+    group every AVAILABILITY_BROADCAST_WINDOW seconds, so a burst of bookings on
+    the same turf becomes a single broadcast.
+
+    Changes usually come from DB threads; when a consumer has bound the process
+    event loop the flush runs on it, otherwise (admin, management commands) it
+    runs on a timer thread.
+    """
+
+    def __init__(self, window=None):
+        self.window = settings.AVAILABILITY_BROADCAST_WINDOW if window is None else window
+        self._pending = defaultdict(list)
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._loop = None
+
+    def bind_loop(self, loop):
+        self._loop = loop
+
+    def publish(self, turf_id, date, delta):
+        with self._lock:
+            self._pending[(int(turf_id), str(date))].append(delta)
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.call_later, self.window, self._flush_on_loop)
+        else:
+            timer = threading.Timer(self.window, self.flush)
+            timer.daemon = True
+            timer.start()
+
+    def _take_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(list)
+            self._scheduled = False
+        return pending
+
+    def _flush_on_loop(self):
+        asyncio.ensure_future(self.aflush())
+
+    async def aflush(self):
+        channel_layer = get_channel_layer()
+        for (turf_id, date), changes in self._take_pending().items():
+            try:
+                await channel_layer.group_send(availability_group(turf_id, date), {
+                    'type': 'availability.delta',
+                    'turf_id': turf_id,
+                    'date': date,
+                    'changes': changes,
+                })
+            except Exception as e:
+                logger.error(f"Error broadcasting availability for turf {turf_id} on {date}: {e}")
+
+    def flush(self):
+        async_to_sync(self.aflush)()
+
+
+broadcaster = AvailabilityBroadcaster()
@@ -0,0 +1,48 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOGUE_MODIFIED_KEY = 'turf-catalogue-modified'
+
+
+def catalogue_modified():
+    """
+    Timestamp of the last change to any turf. List ETags and cached list
+    responses are derived from it, so bumping it invalidates them all.
+    """
+    modified = cache.get(CATALOGUE_MODIFIED_KEY)
+    if modified is None:
+        cache.add(CATALOGUE_MODIFIED_KEY, time.time(), None)
+        modified = cache.get(CATALOGUE_MODIFIED_KEY, time.time())
+    return modified
+
+
+def bump_catalogue():
+    """
+    Mark the turf catalogue as changed once the current transaction commits.
+    """
+    transaction.on_commit(lambda: cache.set(CATALOGUE_MODIFIED_KEY, time.time(), None))
+
+
+def last_modified_second(modified):
+    """
+    `modified` as the whole second sent in Last-Modified, or None while that second
+    has not passed yet: a second change within it would carry the same date, and a
+    client holding the first version would be told it is not modified.
+    """
+    modified = int(modified)
+    return modified if modified < int(time.time()) else None
+
+
+def representation_key(request, *parts):
+    """
+    Digest identifying one representation: the given version parts, the full path
+    (query parameters included), the host and the negotiated format.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = ':'.join(str(part) for part in (
+        *parts, request.get_host(), request.get_full_path(), getattr(renderer, 'format', ''),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
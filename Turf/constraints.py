@@ -0,0 +1,111 @@
+"""
+Database-level guarantee that booked TurfSlot/BadmintonSlot rows do not overlap:
+an exclusion constraint on PostgreSQL, BEFORE INSERT/UPDATE triggers on SQLite.
+Used by migration 0014 and `manage.py resolve_slot_overlaps`, which installs the
+constraints once overlapping bookings left over from before them are resolved.
+On other databases enforce_no_overlap() stands in for them.
+"""
+from django.db import IntegrityError, connection
+
+# Constraints seen in place; they are only dropped when migrating backwards
+_installed = set()
+
+# (table, constraint name, overlap also requires the same sport)
+SLOT_TABLES = [
+    ('Turf_turfslot', 'turfslot_no_overlap', True),
+    ('Turf_badmintonslot', 'badmintonslot_no_overlap', False),
+]
+
+
+def find_overlaps(connection, table, with_sports):
+    """
+    (earlier id, later id) pairs of booked rows that overlap.
+    """
+    sports = 'AND a.sports IS NOT DISTINCT FROM b.sports' if connection.vendor == 'postgresql' else 'AND a.sports IS b.sports'
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT a.id, b.id FROM "{table}" a JOIN "{table}" b
+              ON a.id < b.id AND a.turf_id = b.turf_id AND a.field_size_id = b.field_size_id
+             AND a.date = b.date {sports if with_sports else ''}
+             AND a.start_time < b.end_time AND a.end_time > b.start_time
+           WHERE NOT a.is_available AND NOT b.is_available
+        """)
+        return cursor.fetchall()
+
+
+def has_overlap_constraint(connection, name):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT 1 FROM pg_constraint WHERE conname = %s", [name])
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = %s", [f"{name}_insert"])
+        else:
+            return False
+        return cursor.fetchone() is not None
+
+
+def enforce_no_overlap(slot):
+    """
+    Application-level check for databases without the overlap constraint. Call it
+    inside the transaction that booked `slot`, after the write: it locks the turf
+    row, so bookings of one turf are checked one at a time, and raises the
+    IntegrityError the constraint would have raised when another booked row
+    overlaps. Does nothing once the constraint is in place.
+    """
+    model = type(slot)
+    table, name, with_sports = next(entry for entry in SLOT_TABLES if entry[0] == model._meta.db_table)
+    if (connection.alias, name) in _installed:
+        return
+    if has_overlap_constraint(connection, name):
+        _installed.add((connection.alias, name))
+        return
+    turf_model = model._meta.get_field('turf').related_model
+    list(turf_model.objects.select_for_update().filter(pk=slot.turf_id).values_list('pk'))
+    booked = model.objects.filter(
+        turf_id=slot.turf_id, field_size_id=slot.field_size_id, date=slot.date, is_available=False,
+        start_time__lt=slot.end_time, end_time__gt=slot.start_time,
+    )
+    if with_sports:
+        booked = booked.filter(sports=slot.sports)
+    # The booked slot itself is one of them
+    if booked.count() > 1:
+        raise IntegrityError(name)
+
+
+def add_overlap_constraint(connection, table, name, with_sports):
+    """
+    Install the constraint for one table; the table must not contain overlapping bookings.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+            sports = "COALESCE(sports, '') WITH =," if with_sports else ''
+            cursor.execute(f"""
+                ALTER TABLE "{table}" ADD CONSTRAINT {name} EXCLUDE USING gist (
+                    turf_id WITH =, field_size_id WITH =, {sports}
+                    tsrange(date + start_time, date + end_time, '[)') WITH &&
+                ) WHERE (NOT is_available)
+            """)
+        elif connection.vendor == 'sqlite':
+            sports = 'AND sports IS NEW.sports' if with_sports else ''
+            for event, exclude_self in (('INSERT', ''), ('UPDATE', 'AND id != NEW.id')):
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {name}_{event.lower()} BEFORE {event} ON "{table}"
+                    WHEN NOT NEW.is_available AND EXISTS (
+                        SELECT 1 FROM "{table}"
+                         WHERE turf_id = NEW.turf_id AND field_size_id = NEW.field_size_id
+                           AND date = NEW.date {sports} {exclude_self}
+                           AND NOT is_available
+                           AND start_time < NEW.end_time AND end_time > NEW.start_time
+                    )
+                    BEGIN SELECT RAISE(ABORT, '{name}'); END
+                """)
+
+
+def remove_overlap_constraint(connection, table, name):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT IF EXISTS {name}')
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}_insert')
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}_update')
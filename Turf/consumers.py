@@ -1,38 +1,189 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.db import transaction
-from .models import TurfSlot, UserModel, SwimmingSlot, BadmintonSlot, SwimmingSession
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from .models import TurfSlot, SwimmingSlot, BadmintonSlot, SwimmingSession, CapacityExceeded
+from .slot_index import slot_index, interval_mask
+from .db import retry_transient, is_slot_conflict
+from .constraints import enforce_no_overlap
+from .broadcast import broadcaster, availability_group
+from .signals import publish_slot_change
+from .inventory import claim_slot
+from .schemas import validate_message
+from .throttle import TokenBucket, user_bucket
+from Turf_management.metrics import (
+    ACTIVE_SOCKETS, BOOKING_OUTCOMES, SOCKET_MESSAGE_DB_SECONDS, SOCKET_MESSAGE_QUERIES, SOCKET_MESSAGE_SECONDS,
+    SOCKET_THROTTLED, recording_queries,
+)
+import asyncio
 import json
+import time as clock
+import msgpack
 import logging
+from collections import defaultdict
 from datetime import datetime, time
 
 logger = logging.getLogger(__name__)
 
+
+class BatchConflict(Exception):
+    """
+    Raised inside insert_slots to roll back an all-or-nothing batch when one of its slots was taken.
+    """
+
+
+def booking_outcome(slot_id, is_booked, is_available):
+    """
+    Metrics label for a booking reply: success, overlap (time taken), capacity (session full) or rejected.
+    """
+    if slot_id:
+        return 'success'
+    if is_booked:
+        return 'overlap'
+    if not is_available:
+        return 'capacity'
+    return 'rejected'
+
+
 class TurfSlotConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        await self.accept()
-        logger.debug("WebSocket connection accepted.")
+        self.subscriptions = set()
+        # Resolved once by the auth middleware; bookings are made for this user only
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            logger.debug("WebSocket connection rejected: not authenticated.")
+            await self.close(code=4401)
+            return
+        self.user_id = user.pk
+        # Binary msgpack frames when the client offers the "msgpack" sub-protocol, JSON text otherwise
+        self.use_msgpack = 'msgpack' in self.scope.get('subprotocols', [])
+        # Flood protection: token buckets per socket and per user, and a bounded
+        # queue of accepted messages processed one at a time by a worker task
+        self.connection_bucket = TokenBucket.from_setting(settings.SOCKET_RATE_LIMIT)
+        self.user_bucket = user_bucket(self.user_id, settings.SOCKET_USER_RATE_LIMIT)
+        self.in_flight = asyncio.Queue(maxsize=settings.SOCKET_MAX_IN_FLIGHT)
+        self.worker = asyncio.create_task(self.process_messages())
+        broadcaster.bind_loop(asyncio.get_running_loop())
+        await self.accept(subprotocol='msgpack' if self.use_msgpack else None)
+        ACTIVE_SOCKETS.inc()
+        logger.debug(f"WebSocket connection accepted for user {self.user_id}.")
 
     async def disconnect(self, close_code):
+        worker = getattr(self, 'worker', None)
+        if worker is not None:
+            worker.cancel()
+            ACTIVE_SOCKETS.dec()
+        for group in self.subscriptions:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.subscriptions.clear()
         logger.debug("WebSocket connection closed.")
 
-    async def receive(self, text_data):
-        logger.debug(f"Received data: {text_data}")
-        data = json.loads(text_data)
-        
-        message_type = data.get('type', None)
-        sports = data.get('sports', None)
+    async def receive(self, text_data=None, bytes_data=None):
+        logger.debug(f"Received data: {text_data if text_data is not None else bytes_data}")
+        if self.connection_bucket and not self.connection_bucket.take():
+            await self.throttled('connection_rate_limited', 'Too many messages on this connection, slow down.')
+            return
+        if self.user_bucket and not self.user_bucket.take():
+            await self.throttled('user_rate_limited', 'Too many messages for this user, slow down.')
+            return
+
+        try:
+            data = msgpack.unpackb(bytes_data) if bytes_data is not None else json.loads(text_data)
+        except (ValueError, TypeError, msgpack.UnpackException):
+            await self.send_error('Malformed message.', is_available=True)
+            return
 
-        if not sports:
-            await self.send_error('Missing "sports" field.', is_available=True)
+        # Shape and types are checked against the compiled schema before any handler runs
+        error = validate_message(data)
+        if error:
+            await self.send_error(f'Invalid message: {error}', is_available=True)
             return
 
-        if message_type == 'get_available_sessions' and sports == 'Swimming':
+        try:
+            self.in_flight.put_nowait(data)
+        except asyncio.QueueFull:
+            await self.throttled('queue_full', 'Too many requests in progress, wait for a reply before sending more.')
+
+    async def throttled(self, reason, message):
+        SOCKET_THROTTLED.labels(reason).inc()
+        await self.send_error(message, is_available=True)
+
+    async def process_messages(self):
+        """
+        Handle queued messages in arrival order until the socket closes.
+        """
+        while True:
+            data = await self.in_flight.get()
+            started = clock.perf_counter()
+            with recording_queries() as queries:
+                try:
+                    await self.dispatch_message(data)
+                except Exception as e:
+                    logger.error(f"Error handling {data['type']} message: {e}")
+            elapsed = clock.perf_counter() - started
+            SOCKET_MESSAGE_SECONDS.labels(data['type']).observe(elapsed)
+            SOCKET_MESSAGE_QUERIES.labels(data['type']).observe(queries.count)
+            SOCKET_MESSAGE_DB_SECONDS.labels(data['type']).observe(queries.seconds)
+            if settings.SQL_PROFILING:
+                queries.check_budget(f"Socket message {data['type']} from user {self.user_id}", elapsed)
+                await self.send_message({'type': 'profile', 'message_type': data['type'], **queries.summary(elapsed)})
+
+    async def dispatch_message(self, data):
+        message_type = data['type']
+        if message_type in ('subscribe', 'unsubscribe'):
+            await self.handle_subscription(data, subscribe=message_type == 'subscribe')
+        elif message_type == 'get_available_sessions':
             await self.handle_get_available_sessions(data)
         elif message_type == 'book_slot':
             await self.handle_book_slot(data)
+        elif message_type == 'book_slots':
+            await self.handle_book_slots(data)
+        elif message_type == 'claim_slot':
+            await self.handle_claim_slot(data)
+
+    async def send_message(self, payload):
+        """
+        Send a message in the encoding negotiated at connect.
+        """
+        if self.use_msgpack:
+            await self.send(bytes_data=msgpack.packb(payload))
         else:
-            await self.send_error('Unsupported message type or missing parameters.', is_available=True)
+            await self.send(text_data=json.dumps(payload))
+
+    async def handle_subscription(self, data, subscribe=True):
+        """
+        Join or leave the availability group of a turf on a date.
+        """
+        try:
+            turf_id = int(data['turf_id'])
+            date = datetime.strptime(data['date'], "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            await self.send_error('"date" must be a valid date (YYYY-MM-DD).', is_available=False)
+            return
+
+        group = availability_group(turf_id, date)
+        if subscribe:
+            await self.channel_layer.group_add(group, self.channel_name)
+            self.subscriptions.add(group)
+        else:
+            await self.channel_layer.group_discard(group, self.channel_name)
+            self.subscriptions.discard(group)
+        await self.send_message({
+            'type': 'subscribed' if subscribe else 'unsubscribed',
+            'turf_id': turf_id,
+            'date': date,
+        })
+
+    async def availability_delta(self, event):
+        """
+        Forward a coalesced availability change to a subscribed client.
+        """
+        await self.send_message({
+            'type': 'availability_delta',
+            'turf_id': event['turf_id'],
+            'date': event['date'],
+            'changes': event['changes'],
+        })
 
     async def handle_book_slot(self, data):
         """
@@ -45,7 +196,7 @@ class TurfSlotConsumer(AsyncWebsocketConsumer):
         start_time = data.get('start_time')
         end_time = data.get('end_time')
         date = data.get('date')
-        user_id = data.get('user_id')
+        user_id = self.user_id
         number_of_people = data.get('number_of_people', 1)  # Default to 1 if not provided
 
         try:
@@ -81,22 +232,265 @@ class TurfSlotConsumer(AsyncWebsocketConsumer):
             else:
                 raise ValueError(f"Unsupported sport: {sports}")
 
+            BOOKING_OUTCOMES.labels(sports, booking_outcome(slot_id, is_booked, is_available)).inc()
             # Send a message back with the booking status
-            await self.send(text_data=json.dumps({
+            await self.send_message({
                 'message': message,
                 'slot_id': slot_id,
                 'isBooked': is_booked,
                 'isAvailable': is_available,
-            }))
+            })
         except Exception as e:
+            BOOKING_OUTCOMES.labels(sports, 'error').inc()
             logger.error(f"Error booking slot: {e}")
-            await self.send(text_data=json.dumps({
+            await self.send_message({
+                'message': f'Error booking slot: {str(e)}. Please try again.',
+                'isBooked': False,
+                'isAvailable': True
+            })
+
+    async def handle_book_slots(self, data):
+        """
+        Handle a batch of Cricket, Football or Badminton slot requests in one round trip.
+        With "mode": "all" (the default) nothing is booked unless every slot can be;
+        with "mode": "partial" every slot that can be booked is.
+        """
+        slots = data['slots']
+        mode = data.get('mode', 'all')
+
+        try:
+            results = await self.create_slots(self.user_id, slots, data.get('sports'), mode)
+            for item, result in zip(slots, results):
+                BOOKING_OUTCOMES.labels(item.get('sports') or data.get('sports'), booking_outcome(
+                    result['slot_id'], result['isBooked'], result['isAvailable'])).inc()
+            await self.send_message({
+                'type': 'book_slots',
+                'results': results,
+                'isBooked': all(result['slot_id'] for result in results),
+            })
+        except Exception as e:
+            BOOKING_OUTCOMES.labels(data.get('sports'), 'error').inc()
+            logger.error(f"Error booking slots: {e}")
+            await self.send_message({
+                'message': f'Error booking slots: {str(e)}. Please try again.',
+                'isBooked': False,
+                'isAvailable': True
+            })
+
+    async def handle_claim_slot(self, data):
+        """
+        Book a slot generated from opening hours by its id.
+        """
+        sports = data['sports']
+        model = BadmintonSlot if sports == 'Badminton' else TurfSlot
+        try:
+            slot = await self.claim_open_slot(
+                model, self.user_id, None if model is BadmintonSlot else sports, id=data['slot_id'],
+            )
+            if slot is None:
+                slot_id, message, is_booked, is_available = None, 'This slot is no longer available. Please choose a different one.', True, False
+            else:
+                slot_id, message, is_booked, is_available = slot.id, 'Slot booked successfully.', True, False
+            BOOKING_OUTCOMES.labels(sports, booking_outcome(slot_id, is_booked, is_available)).inc()
+            await self.send_message({
+                'message': message,
+                'slot_id': slot_id,
+                'isBooked': is_booked,
+                'isAvailable': is_available,
+            })
+        except Exception as e:
+            BOOKING_OUTCOMES.labels(sports, 'error').inc()
+            logger.error(f"Error claiming slot: {e}")
+            await self.send_message({
                 'message': f'Error booking slot: {str(e)}. Please try again.',
                 'isBooked': False,
                 'isAvailable': True
+            })
+
+    @database_sync_to_async
+    @retry_transient
+    def claim_open_slot(self, model, user_id, sports, **lookup):
+        return claim_slot(model, user_id, sports, **lookup)
+
+    async def create_slots(self, user_id, slots, default_sports, mode):
+        """
+        Validate every requested slot, check overlaps with one query per turf and date,
+        and book the bookable ones in a single transaction: slots that exist as open
+        inventory are claimed, the others inserted with bulk_create.
+        """
+        results = [None] * len(slots)
+        accepted = []
+        current_datetime = datetime.now()
+
+        for index, item in enumerate(slots):
+            sports = item.get('sports') or default_sports
+            if sports in ['Cricket', 'Football']:
+                model = TurfSlot
+            elif sports == 'Badminton':
+                model, sports = BadmintonSlot, None
+            else:
+                results[index] = self.slot_result(index, None, f'Unsupported sport for batch booking: {sports}', False, True)
+                continue
+            try:
+                start_datetime = datetime.strptime(f"{item['date']} {item['start_time']}", "%Y-%m-%d %H:%M")
+                end_datetime = datetime.strptime(f"{item['date']} {item['end_time']}", "%Y-%m-%d %H:%M")
+                turf_id, field_size_id = int(item['turf_id']), int(item['field_size_id'])
+            except (KeyError, TypeError, ValueError):
+                results[index] = self.slot_result(index, None, 'Invalid slot: expected turf_id, field_size_id, date, start_time and end_time.', False, True)
+                continue
+            if start_datetime >= end_datetime:
+                results[index] = self.slot_result(index, None, 'Start time must be earlier than end time.', False, True)
+                continue
+            if start_datetime < current_datetime:
+                results[index] = self.slot_result(index, None, 'Cannot book a slot in the past. Please select a future date and time.', False, True)
+                continue
+            accepted.append((index, model, {
+                'turf_id': turf_id,
+                'field_size_id': field_size_id,
+                'sports': sports,
+                'date': start_datetime.date(),
+                'start_time': start_datetime.time(),
+                'end_time': end_datetime.time(),
             }))
+
+        # One query per (model, turf, date) finds the bookings that overlap the requests and the
+        # open slots that match them exactly; requests in the batch are also checked against each other
+        groups = defaultdict(list)
+        for entry in accepted:
+            groups[(entry[1], entry[2]['turf_id'], entry[2]['date'])].append(entry)
+
+        bookable = []
+        for (model, turf_id, date), entries in groups.items():
+            booked = defaultdict(int)
+            open_slots = set()
+            existing = model.objects.filter(
+                turf_id=turf_id,
+                date=date,
+                field_size_id__in={fields['field_size_id'] for _, _, fields in entries},
+                start_time__lt=max(fields['end_time'] for _, _, fields in entries),
+                end_time__gt=min(fields['start_time'] for _, _, fields in entries),
+            ).values_list('field_size_id', 'start_time', 'end_time', 'is_available', *(['sports'] if model is TurfSlot else []))
+            async for field_size_id, start_time, end_time, is_available, *sports in existing:
+                key = (field_size_id, sports[0] if sports else None)
+                if is_available:
+                    open_slots.add((key, start_time, end_time))
+                else:
+                    booked[key] |= interval_mask(start_time, end_time)
+
+            for index, _, fields in entries:
+                key = (fields['field_size_id'], fields['sports'])
+                mask = interval_mask(fields['start_time'], fields['end_time'])
+                if booked[key] & mask:
+                    results[index] = self.slot_result(index, None, 'The selected slot is already booked. Please choose a different time.', True, False)
+                    continue
+                booked[key] |= mask
+                claim = (key, fields['start_time'], fields['end_time']) in open_slots
+                bookable.append((index, model, fields, claim))
+
+        if mode == 'all' and len(bookable) < len(slots):
+            for index, _, _, _ in bookable:
+                results[index] = self.slot_result(index, None, 'Not booked because another slot in the batch is unavailable.', False, True)
+            return results
+
+        if bookable:
+            created = await self.insert_slots(
+                user_id, [(model, fields, claim) for _, model, fields, claim in bookable], all_or_nothing=mode == 'all',
+            )
+            for (index, _, _, _), slot in zip(bookable, created):
+                if slot is not None:
+                    results[index] = self.slot_result(index, slot.id, 'Slot booked successfully.', True, False)
+                elif mode == 'all':
+                    # Another socket booked one of the slots after the overlap check; the transaction rolled back
+                    results[index] = self.slot_result(index, None, 'One of the selected slots was just booked. Please try again.', False, True)
+                else:
+                    results[index] = self.slot_result(index, None, 'The selected slot was just booked. Please choose a different time.', True, False)
+        return results
+
     @database_sync_to_async
-    def create_turf_slot(self, user_id, turf_id, field_size_id, sports, start_time, end_time, date):
+    @retry_transient
+    def insert_slots(self, user_id, requests, all_or_nothing):
+        """
+        Book (model, fields, claim) requests in one transaction. Requests with claim set
+        take the matching open slot with claim_slot; the others are inserted with one
+        bulk_create per model. Returns the booked slot per request, or None for a slot
+        another socket took first. With all_or_nothing a single None rolls back the
+        batch and every request gets None.
+        """
+        booked = [None] * len(requests)
+        try:
+            with transaction.atomic():
+                inserts = defaultdict(list)
+                for position, (model, fields, claim) in enumerate(requests):
+                    if model is BadmintonSlot:
+                        fields = {key: value for key, value in fields.items() if key != 'sports'}
+                    if claim:
+                        booked[position] = self.claim_requested_slot(model, user_id, fields)
+                        if booked[position] is None and all_or_nothing:
+                            raise BatchConflict
+                    else:
+                        inserts[model].append((position, model(user_id=user_id, is_available=False, is_booked=True, **fields)))
+
+                for model, rows in inserts.items():
+                    try:
+                        with transaction.atomic():
+                            model.objects.bulk_create([slot for _, slot in rows])
+                            for _, slot in rows:
+                                enforce_no_overlap(slot)
+                    except IntegrityError as e:
+                        if not is_slot_conflict(e):
+                            raise
+                        if all_or_nothing:
+                            raise BatchConflict
+                        # Partial batch: book the rows one by one so only the conflicting ones fail
+                        for position, slot in rows:
+                            booked[position] = self.insert_requested_slot(model, user_id, slot)
+                        continue
+                    for position, slot in rows:
+                        booked[position] = slot
+                        # bulk_create does not send post_save, so update the slot index and subscribers here
+                        slot_index.add_on_commit(slot)
+                        publish_slot_change(slot, 'booked')
+        except BatchConflict:
+            return [None] * len(requests)
+        return booked
+
+    @staticmethod
+    def claim_requested_slot(model, user_id, fields):
+        return claim_slot(
+            model, user_id, fields.get('sports'),
+            turf_id=fields['turf_id'], field_size_id=fields['field_size_id'], date=fields['date'],
+            start_time=fields['start_time'], end_time=fields['end_time'],
+        )
+
+    def insert_requested_slot(self, model, user_id, slot):
+        """
+        Insert one batch row in its own savepoint; when it conflicts, claim the open
+        slot generated for the same time range in the meantime, if there is one.
+        """
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([slot])
+                enforce_no_overlap(slot)
+        except IntegrityError as e:
+            if not is_slot_conflict(e):
+                raise
+            fields = {name: getattr(slot, name) for name in ('turf_id', 'field_size_id', 'date', 'start_time', 'end_time')}
+            return self.claim_requested_slot(model, user_id, dict(fields, sports=getattr(slot, 'sports', None)))
+        slot_index.add_on_commit(slot)
+        publish_slot_change(slot, 'booked')
+        return slot
+
+    @staticmethod
+    def slot_result(index, slot_id, message, is_booked, is_available):
+        return {
+            'index': index,
+            'message': message,
+            'slot_id': slot_id,
+            'isBooked': is_booked,
+            'isAvailable': is_available,
+        }
+
+    async def create_turf_slot(self, user_id, turf_id, field_size_id, sports, start_time, end_time, date):
         """
         Create a turf slot for Cricket or Football.
         """
@@ -113,35 +507,29 @@ class TurfSlotConsumer(AsyncWebsocketConsumer):
         if start_datetime < current_datetime:
             return None, 'Cannot book a slot in the past. Please select a future date and time.', False, True
 
-        # Step 3: Check for existing slots at the same time
-        overlapping_slot = TurfSlot.objects.filter(
-            turf_id=turf_id,
-            field_size_id=field_size_id,
-            sports=sports,  # Ensure sports is correctly used
-            date=date,
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-            is_available=True,
-        ).exists()
-
-        if overlapping_slot:
+        # Step 3: Reject obvious overlaps from the in-process index without a DB round trip
+        if await slot_index.aoverlaps(TurfSlot, turf_id, field_size_id, sports, date, start_time, end_time):
             return None, 'The selected slot is already booked. Please choose a different time.', True, False
 
-        user = UserModel.objects.get(id=user_id)
-        turf_slot = TurfSlot.objects.create(
-            user=user,
+        # Step 4: Insert; the overlap constraint rejects the booking if the time is taken
+        turf_slot = await self.insert_slot(
+            TurfSlot,
+            user_id=user_id,
             turf_id=turf_id,
             sports=sports,
             field_size_id=field_size_id,
             start_time=start_time,
             end_time=end_time,
             date=date,
-            is_available=False, 
+            is_available=False,
+            is_booked=True,
         )
+        if turf_slot is None:
+            slot_index.invalidate(TurfSlot, turf_id, field_size_id, sports, date)
+            return None, 'The selected slot is already booked. Please choose a different time.', True, False
         return turf_slot.id, 'Slot booked successfully.', True, False
 
-    @database_sync_to_async
-    def create_swimming_slot(self, user_id, turf_id, field_size_id, session_id, date, number_of_people):
+    async def create_swimming_slot(self, user_id, turf_id, field_size_id, session_id, date, number_of_people):
         """
         Create a swimming slot.
         """
@@ -155,7 +543,7 @@ class TurfSlotConsumer(AsyncWebsocketConsumer):
             return None, 'Invalid number of people. Please enter a valid number.', False, True
 
         try:
-            session = SwimmingSession.objects.get(id=session_id)
+            session = await SwimmingSession.objects.aget(id=session_id)
             logger.debug(f"Found SwimmingSession: ID={session.id}, Start={session.start_time}, End={session.end_time}")
         except SwimmingSession.DoesNotExist:
             logger.debug(f"SwimmingSession with ID={session_id} does not exist.")
@@ -172,40 +560,33 @@ class TurfSlotConsumer(AsyncWebsocketConsumer):
             logger.debug(f"Attempted to book a session in the past: {session_date}")
             return None, 'Cannot book a slot in the past. Please select a future date.', False, True
 
-        # Check remaining capacity
-        remaining_capacity = session.remaining_capacity(session_date)
-        logger.debug(f"Remaining capacity for session ID={session.id} on {session_date}: {remaining_capacity}")
+        return await self.reserve_swimming_slot(user_id, turf_id, field_size_id, session, session_date, number_of_people)
 
-        if remaining_capacity < number_of_people:
-            logger.debug(f"Not enough capacity: Requested={number_of_people}, Available={remaining_capacity}")
-            return None, f'Only {remaining_capacity} spots are available for this session.', False, False
-
-        with transaction.atomic():
-            # Re-fetch the session with a lock to prevent race conditions
-            session = SwimmingSession.objects.select_for_update().get(id=session_id)
-            remaining_capacity = session.remaining_capacity(session_date)
-            logger.debug(f"Locked SwimmingSession: ID={session.id}, Remaining Capacity={remaining_capacity}")
-
-            if remaining_capacity < number_of_people:
-                logger.debug("Cannot book. Slot capacity exceeded after locking.")
-                raise ValueError("Cannot book. Slot capacity exceeded.")
-
-            # Create the SwimmingSlot
-            user = UserModel.objects.get(id=user_id)
+    @database_sync_to_async
+    @retry_transient
+    def reserve_swimming_slot(self, user_id, turf_id, field_size_id, session, session_date, number_of_people):
+        """
+        Claim capacity and create the SwimmingSlot in one transaction.
+        """
+        try:
+            # SwimmingSlot.save claims the spots with a conditional UPDATE on the occupancy counter
             swimming_slot = SwimmingSlot.objects.create(
-                user=user,
+                user_id=user_id,
                 turf_id=turf_id,
                 field_size_id=field_size_id,
                 session=session,
                 date=session_date,
                 number_of_people=number_of_people,
             )
-            logger.debug(f"Created SwimmingSlot: ID={swimming_slot.id}, User={user.id}, People={number_of_people}")
+        except CapacityExceeded:
+            remaining_capacity = session.remaining_capacity(session_date)
+            logger.debug(f"Not enough capacity: Requested={number_of_people}, Available={remaining_capacity}")
+            return None, f'Only {max(remaining_capacity, 0)} spots are available for this session.', False, False
+        logger.debug(f"Created SwimmingSlot: ID={swimming_slot.id}, User={user_id}, People={number_of_people}")
 
         return swimming_slot.id, 'Swimming slot booked successfully.', True, True
 
-    @database_sync_to_async
-    def create_badminton_slot(self, user_id, turf_id, field_size_id, start_time, end_time, date):
+    async def create_badminton_slot(self, user_id, turf_id, field_size_id, start_time, end_time, date):
         """
         Create a badminton slot.
         """
@@ -220,33 +601,46 @@ class TurfSlotConsumer(AsyncWebsocketConsumer):
         if start_datetime < current_datetime:
             return None, 'Cannot book a slot in the past. Please select a future date and time.', False, True
 
-        # Check for existing slots at the same time
-        overlapping_slot = BadmintonSlot.objects.filter(
-            turf_id=turf_id,
-            field_size_id=field_size_id,
-            date=date,
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-            is_available=True,
-        ).exists()
-
-        if overlapping_slot:
+        # Reject obvious overlaps from the in-process index without a DB round trip
+        if await slot_index.aoverlaps(BadmintonSlot, turf_id, field_size_id, None, date, start_time, end_time):
             return None, 'The selected slot is already booked. Please choose a different time.', True, False
 
-        user = UserModel.objects.get(id=user_id)
-        badminton_slot = BadmintonSlot.objects.create(
-            user=user,
+        # Insert; the overlap constraint rejects the booking if the time is taken
+        badminton_slot = await self.insert_slot(
+            BadmintonSlot,
+            user_id=user_id,
             turf_id=turf_id,
             field_size_id=field_size_id,
             start_time=start_time,
             end_time=end_time,
             date=date,
-            is_available=False, 
+            is_available=False,
+            is_booked=True,
         )
+        if badminton_slot is None:
+            slot_index.invalidate(BadmintonSlot, turf_id, field_size_id, None, date)
+            return None, 'The selected slot is already booked. Please choose a different time.', True, False
         return badminton_slot.id, 'Slot booked successfully.', True, False
 
     @database_sync_to_async
-    def get_available_swimming_sessions(self, date):
+    @retry_transient
+    def insert_slot(self, model, **fields):
+        """
+        Insert a booked TurfSlot or BadmintonSlot.
+        Returns None when the database rejects it as overlapping an existing booking.
+        """
+        try:
+            with transaction.atomic():
+                slot = model.objects.create(**fields)
+                enforce_no_overlap(slot)
+                return slot
+        except IntegrityError as e:
+            if not is_slot_conflict(e):
+                raise
+        # The same time range may exist as an open slot generated from opening hours
+        return self.claim_requested_slot(model, fields['user_id'], fields)
+
+    async def get_available_swimming_sessions(self, date):
         """
         Retrieve available swimming sessions for a given date.
         """
@@ -255,37 +649,28 @@ class TurfSlotConsumer(AsyncWebsocketConsumer):
         except ValueError:
             raise ValueError("Invalid date format. Expected 'YYYY-MM-DD'.")
 
-        sessions = SwimmingSession.objects.all()
-        available_sessions = []
-
-        for session in sessions:
-            remaining_capacity = session.remaining_capacity(session_date)
-            if remaining_capacity > 0:
-                available_sessions.append({
-                    'session_id': session.id,
-                    'start_time': session.start_time.strftime("%H:%M"),
-                    'end_time': session.end_time.strftime("%H:%M"),
-                    'remaining_capacity': remaining_capacity,
-                    'price_per_person': float(session.price_per_person),
-                })
-
-        return available_sessions
+        return [
+            {
+                'session_id': session.id,
+                'start_time': session.start_time.strftime("%H:%M"),
+                'end_time': session.end_time.strftime("%H:%M"),
+                'remaining_capacity': session.remaining,
+                'price_per_person': float(session.price_per_person),
+            }
+            async for session in SwimmingSession.objects.available_on(session_date)
+        ]
 
     async def handle_get_available_sessions(self, data):
         """
         Handle the retrieval of available swimming sessions.
         """
-        date = data.get('date', None)
-        if not date:
-            await self.send_error('Missing "date" field.', is_available=False)
-            return
-
+        date = data['date']
         try:
             available_sessions = await self.get_available_swimming_sessions(date)
-            await self.send(text_data=json.dumps({
+            await self.send_message({
                 'type': 'available_sessions',
                 'sessions': available_sessions
-            }))
+            })
         except Exception as e:
             logger.error(f"Error fetching available sessions: {e}")
             await self.send_error('Error fetching available sessions.', is_available=False)
@@ -294,8 +679,8 @@ class TurfSlotConsumer(AsyncWebsocketConsumer):
         """
         Send an error message back to the client.
         """
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'message': f'Error: {message}',
             'isBooked': False,
             'isAvailable': is_available
-        }))
+        })
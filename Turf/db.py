@@ -0,0 +1,41 @@
+import functools
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+
+
+def is_slot_conflict(error):
+    """
+    True when an IntegrityError comes from the slot overlap or uniqueness
+    constraints, as opposed to e.g. a missing foreign key.
+    """
+    message = str(error).lower()
+    return 'no_overlap' in message or 'unique' in message or 'duplicate key' in message
+
+
+def is_transient(error):
+    """
+    Deadlocks, serialization failures and SQLite lock timeouts: the write did not
+    conflict with another booking and can simply be tried again.
+    """
+    message = str(error).lower()
+    return any(text in message for text in ('deadlock', 'could not serialize', 'database is locked'))
+
+
+def retry_transient(func):
+    """
+    Re-run a write up to BOOKING_WRITE_RETRIES times when it fails with a transient
+    error, backing off a little between attempts. Constraint violations are not retried.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = settings.BOOKING_WRITE_RETRIES + 1
+        for attempt in range(attempts):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == attempts - 1 or not is_transient(e):
+                    raise
+                time.sleep(0.01 * 2 ** attempt)
+    return wrapper
@@ -0,0 +1,94 @@
+"""
+Geohash and great-circle helpers for the nearby-turf lookup. Pure Python so the
+lookup works on any database without PostGIS.
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Geohash of a point; a prefix of it is the cell containing the point at a coarser precision.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """
+    (height, width) in degrees of a geohash cell of the given precision.
+    """
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in kilometres.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    (min_lat, max_lat, min_lng, max_lng) enclosing the circle. Longitudes may fall
+    outside [-180, 180] when the box crosses the antimeridian; near the poles the
+    box covers every longitude.
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - d_lat, latitude + d_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    d_lng = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude)))))
+    if d_lng >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, longitude - d_lng, longitude + d_lng
+
+
+def covering_cells(min_lat, max_lat, min_lng, max_lng):
+    """
+    Geohash prefixes whose cells together cover the box: the finest precision whose
+    cells are at least as large as the box, so its four corners land in at most
+    2x2 cells. Returns None when the box is too large for any prefix to help.
+    """
+    height, width = max_lat - min_lat, max_lng - min_lng
+    precision = 0
+    while precision < GEOHASH_PRECISION:
+        cell_height, cell_width = cell_size(precision + 1)
+        if cell_height < height or cell_width < width:
+            break
+        precision += 1
+    if precision == 0:
+        return None
+    return sorted({
+        encode(lat, (lng + 180) % 360 - 180, precision)
+        for lat in (min_lat, max_lat) for lng in (min_lng, max_lng)
+    })
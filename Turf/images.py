@@ -0,0 +1,62 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANT_DIR = 'turf_images/variants'
+VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def content_hash(file):
+    """
+    sha256 of a file's contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def variant_path(image_hash, name, extension):
+    return f"{VARIANT_DIR}/{image_hash[:2]}/{image_hash}_{name}.{extension}"
+
+
+def build_variants(file, image_hash, storage=default_storage):
+    """
+    Write every TURF_IMAGE_VARIANTS size of the image in each of VARIANT_FORMATS and
+    return {name: {extension: path}}. Paths are derived from the content hash, so
+    files that already exist (same upload seen before) are reused, not re-encoded.
+    """
+    paths = {
+        name: {extension: variant_path(image_hash, name, extension) for extension in VARIANT_FORMATS}
+        for name in settings.TURF_IMAGE_VARIANTS
+    }
+    missing = [
+        (name, extension, path)
+        for name, formats in paths.items() for extension, path in formats.items()
+        if not storage.exists(path)
+    ]
+    if not missing:
+        return paths
+
+    file.seek(0)
+    with Image.open(file) as original:
+        source = ImageOps.exif_transpose(original).convert('RGB')
+    resized = {}
+    for name, extension, path in missing:
+        if name not in resized:
+            resized[name] = ImageOps.fit(source, settings.TURF_IMAGE_VARIANTS[name], Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        resized[name].save(buffer, **VARIANT_FORMATS[extension])
+        # Another worker may have written the same content in the meantime; either copy will do
+        if not storage.exists(path):
+            storage.save(path, ContentFile(buffer.getvalue()))
+    return paths
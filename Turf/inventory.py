@@ -0,0 +1,124 @@
+"""
+Pre-generated slot inventory. Opening hours are materialised into open
+TurfSlot/BadmintonSlot rows ahead of time, and booking one is a single
+conditional UPDATE that only succeeds while the row is still open.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+
+from .availability import availability_cache_key
+from .constraints import enforce_no_overlap
+from .db import is_slot_conflict
+from .models import OpeningHours
+from .signals import publish_slot_change
+from .slot_index import slot_index
+
+logger = logging.getLogger(__name__)
+
+RETURNED_FIELDS = ['id', 'turf_id', 'field_size_id', 'date', 'start_time', 'end_time']
+
+
+def _returned_fields(model):
+    return RETURNED_FIELDS + ['sports'] if hasattr(model, 'sports') else RETURNED_FIELDS
+
+
+def generate_inventory(days=None, start=None):
+    """
+    Create the open slots of every OpeningHours entry for `days` days from `start`
+    (today by default). Slots that already exist are left alone, so the command
+    can run daily. Returns the number of rows sent to the database.
+    """
+    days = settings.SLOT_INVENTORY_DAYS if days is None else days
+    start = start or datetime.today().date()
+    dates_by_weekday = {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        dates_by_weekday.setdefault(day.weekday(), []).append(day)
+
+    rows = {}
+    touched = set()
+    for hours in OpeningHours.objects.all():
+        model = hours.slot_model
+        extra = {} if hours.sports == 'Badminton' else {'sports': hours.sports}
+        times = hours.slot_times()
+        for day in dates_by_weekday.get(hours.weekday, []):
+            touched.add((hours.turf_id, day))
+            rows.setdefault(model, []).extend(
+                model(
+                    turf_id=hours.turf_id,
+                    field_size_id=hours.field_size_id,
+                    date=day,
+                    start_time=start_time,
+                    end_time=end_time,
+                    is_available=True,
+                    is_booked=False,
+                    price=hours.price,
+                    advance_price=hours.advance_price,
+                    **extra,
+                )
+                for start_time, end_time in times
+            )
+
+    count = 0
+    for model, objs in rows.items():
+        # unique_together (turf, field size, sports, date, start, end) skips slots generated earlier
+        model.objects.bulk_create(objs, ignore_conflicts=True, batch_size=settings.SLOT_INVENTORY_BATCH_SIZE)
+        count += len(objs)
+    cache.delete_many([availability_cache_key(turf_id, day) for turf_id, day in touched])
+    logger.debug(f"Generated {count} open slots for {len(touched)} turf days.")
+    return count
+
+
+def _db_value(model, name, value):
+    field = model._meta.get_field(name)
+    return field.get_db_prep_value(field.to_python(value), connection)
+
+
+def claim_slot(model, user_id, sports=None, **lookup):
+    """
+    Book an open TurfSlot or BadmintonSlot for `user_id` with one conditional UPDATE.
+    `lookup` is either id=... or the slot's turf_id, field_size_id, date, start_time
+    and end_time. Returns the booked slot, or None when no open, future slot matches
+    or claiming it would overlap a booking made for a different time range.
+    """
+    now = datetime.now()
+    conditions = [f'"{name}" = %s' for name in lookup]
+    params = [_db_value(model, 'user', user_id)]
+    params += [_db_value(model, name, value) for name, value in lookup.items()]
+    if sports:
+        conditions.append('"sports" = %s')
+        params.append(sports)
+    conditions.append('"is_available" AND ("date" > %s OR ("date" = %s AND "start_time" > %s))')
+    today = _db_value(model, 'date', now.date())
+    params += [today, today, _db_value(model, 'start_time', now.time())]
+
+    returned = _returned_fields(model)
+    columns = ", ".join(f'"{name}"' for name in returned)
+    sql = (
+        f'UPDATE "{model._meta.db_table}" SET "is_available" = false, "is_booked" = true, "user_id" = %s '
+        f'WHERE {" AND ".join(conditions)} '
+        f'RETURNING {columns}'
+    )
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+            if row is None:
+                return None
+            slot = model(user_id=user_id, is_available=False, is_booked=True, **{
+                name: model._meta.get_field(name).to_python(value) for name, value in zip(returned, row)
+            })
+            enforce_no_overlap(slot)
+            # Raw UPDATE: no post_save, so update the slot index, subscribers and the availability cache here
+            slot_index.add_on_commit(slot)
+            publish_slot_change(slot, 'booked')
+    except IntegrityError as e:
+        if is_slot_conflict(e):
+            return None
+        raise
+    return slot
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import time
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from Turf.benchmarks import IN_MEMORY_CHANNEL_LAYERS, scratch_database, make_users, make_turf, future_date, summarize
+from Turf.consumers import TurfSlotConsumer
+from Turf.models import SwimmingSession
+from Turf.slot_index import slot_index
+
+
+class Command(BaseCommand):
+    help = "Measure booking throughput of TurfSlotConsumer with concurrent sockets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', type=int, default=50)
+        parser.add_argument('--messages', type=int, default=10, help="book_slot messages per socket")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            users = make_users(options['sockets'])
+            turf, (field_size,) = make_turf()
+            SwimmingSession.objects.bulk_create(
+                SwimmingSession(start_time=f"{hour:02d}:00", end_time=f"{hour + 1:02d}:00") for hour in range(6, 22)
+            )
+            slot_index.clear()
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS,
+                                   SOCKET_RATE_LIMIT=None, SOCKET_USER_RATE_LIMIT=None):
+                stats = asyncio.run(self.run(users, turf, field_size, options['messages']))
+            self.stdout.write(
+                f"{stats['count']} messages, {stats['throughput']:.1f} msg/s, "
+                f"p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+            )
+
+    async def run(self, users, turf, field_size, messages):
+        latencies = []
+
+        async def client(index, user):
+            communicator = WebsocketCommunicator(TurfSlotConsumer.as_asgi(), '/ws/turf-slot/')
+            communicator.scope['user'] = user
+            await communicator.connect()
+            # Every socket books its own day so the run measures throughput, not contention
+            day = future_date(30 + index).isoformat()
+            for hour in range(messages):
+                payload = {
+                    'type': 'book_slot', 'sports': 'Football', 'turf_id': turf.id,
+                    'field_size_id': field_size.id, 'date': day,
+                    'start_time': f"{hour % 24:02d}:00", 'end_time': f"{hour % 24:02d}:30",
+                }
+                started = time.perf_counter()
+                await communicator.send_to(text_data=json.dumps(payload))
+                await communicator.receive_from(timeout=60)
+                latencies.append(time.perf_counter() - started)
+            await communicator.disconnect()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(index, user) for index, user in enumerate(users)))
+        return summarize(latencies, time.perf_counter() - started)
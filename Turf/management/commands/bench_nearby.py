@@ -0,0 +1,79 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from Turf import geo
+from Turf.benchmarks import scratch_database, summarize
+from Turf.models import Turf
+from Turf.search import nearby_turfs
+
+# Synthetic turfs are scattered over roughly the extent of Bangladesh
+LAT_RANGE = (20.6, 26.6)
+LNG_RANGE = (88.0, 92.7)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure /turfs/nearby/ lookups over a synthetic dataset and compare them with "
+        "ranking every turf in Python."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turfs', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--radius', type=float, default=5.0, help="search radius in km")
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            started = time.perf_counter()
+            self.populate(rng, options['turfs'])
+            self.stdout.write(f"created {options['turfs']} turfs in {time.perf_counter() - started:.1f}s")
+
+            points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(options['queries'])]
+            radius, limit = options['radius'], options['limit']
+            queryset = Turf.objects.all()
+
+            indexed, found = self.measure(points, lambda lat, lng: nearby_turfs(queryset, lat, lng, radius, limit))
+            scan, _ = self.measure(points, lambda lat, lng: self.full_scan(lat, lng, radius, limit))
+
+            for label, stats in (('geohash + bbox', indexed), ('full scan', scan)):
+                self.stdout.write(
+                    f"{label}: {stats['count']} queries, {stats['throughput']:.1f} q/s, "
+                    f"p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms"
+                )
+            self.stdout.write(f"average results per query: {found / len(points):.1f}")
+
+    def populate(self, rng, count, batch_size=5000):
+        for offset in range(0, count, batch_size):
+            turfs = []
+            for i in range(offset, min(offset + batch_size, count)):
+                latitude, longitude = rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+                turfs.append(Turf(
+                    name=f"Turf {i}", location='Benchmark', image='turf_images/bench.jpg',
+                    latitude=latitude, longitude=longitude, geohash=geo.encode(latitude, longitude),
+                ))
+            # bulk_create skips save(), so the geohash is filled in above
+            Turf.objects.bulk_create(turfs)
+
+    @staticmethod
+    def full_scan(latitude, longitude, radius, limit):
+        distances = sorted(
+            (geo.haversine(latitude, longitude, lat, lng), pk)
+            for pk, lat, lng in Turf.objects.values_list('pk', 'latitude', 'longitude')
+        )
+        return [item for item in distances if item[0] <= radius][:limit]
+
+    @staticmethod
+    def measure(points, lookup):
+        latencies = []
+        found = 0
+        started = time.perf_counter()
+        for latitude, longitude in points:
+            query_started = time.perf_counter()
+            found += len(lookup(latitude, longitude))
+            latencies.append(time.perf_counter() - query_started)
+        return summarize(latencies, time.perf_counter() - started), found
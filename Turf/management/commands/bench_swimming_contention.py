@@ -0,0 +1,132 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.test.utils import override_settings
+
+from Turf.benchmarks import (
+    IN_MEMORY_CHANNEL_LAYERS, scratch_database, make_users, make_turf, future_date, summarize, count_capacity_overruns,
+)
+from Turf.db import retry_transient
+from Turf.models import CapacityExceeded, SwimmingSession, SwimmingSlot
+
+
+def book_with_session_lock(session_id, user_id, turf_id, field_size_id, day, people, hold):
+    """
+    The previous strategy: lock the SwimmingSession row, shared by every date, check
+    the remaining capacity, then create the slot (which updates the counter).
+    """
+    with transaction.atomic():
+        session = SwimmingSession.objects.select_for_update().get(id=session_id)
+        if session.remaining_capacity(day) < people:
+            return False
+        SwimmingSlot.objects.create(user_id=user_id, turf_id=turf_id, field_size_id=field_size_id,
+                                    session=session, date=day, number_of_people=people)
+        time.sleep(hold)
+    return True
+
+
+def book_with_occupancy_row(session_id, user_id, turf_id, field_size_id, day, people, hold):
+    """
+    The current strategy (TurfSlotConsumer.reserve_swimming_slot): creating the slot
+    claims the spots with a conditional UPDATE of the (session, date) counter row.
+    """
+    session = SwimmingSession.objects.get(id=session_id)
+    try:
+        with transaction.atomic():
+            SwimmingSlot.objects.create(user_id=user_id, turf_id=turf_id, field_size_id=field_size_id,
+                                        session=session, date=day, number_of_people=people)
+            time.sleep(hold)
+    except CapacityExceeded:
+        return False
+    return True
+
+
+STRATEGIES = {
+    'session-lock': book_with_session_lock,
+    'occupancy-row': book_with_occupancy_row,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare swimming booking strategies under contention: a session-wide "
+        "select_for_update against the per-date conditional UPDATE, once with every "
+        "thread booking the same date and once with each thread booking its own date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--bookings', type=int, default=50, help="bookings per thread")
+        parser.add_argument('--hold-ms', type=float, default=2,
+                            help="extra time each booking transaction stays open, e.g. for payment bookkeeping")
+        parser.add_argument('--strategies', nargs='+', choices=sorted(STRATEGIES), default=list(STRATEGIES))
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            if connection.vendor != 'postgresql':
+                self.stdout.write(self.style.WARNING(
+                    f"{connection.vendor} has no row locks: select_for_update is ignored, every writer takes "
+                    f"the database lock and read-then-write transactions (session-lock) fail with 'database "
+                    f"is locked'. Use PostgreSQL to compare the lock scopes."
+                ))
+            users = make_users(options['threads'])
+            turf, (field_size,) = make_turf()
+            # Large enough that no booking is refused: the run measures waiting, not rejections
+            session = SwimmingSession.objects.create(
+                start_time='06:00', end_time='07:00', capacity=options['threads'] * options['bookings'],
+            )
+
+            offset = 0
+            for workload in ('same date', 'different dates'):
+                for name in options['strategies']:
+                    offset += options['threads']
+                    with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS):
+                        stats, errors = self.run(STRATEGIES[name], session, users, turf, field_size, offset,
+                                                 same_date=workload == 'same date', options=options)
+                    self.stdout.write(
+                        f"{workload:>15} {name:>13}: {stats['count']} bookings, {stats['throughput']:.1f}/s, "
+                        f"p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+                        f"{f', {errors} failed' if errors else ''}"
+                    )
+
+            overruns, mismatches = count_capacity_overruns()
+        report = f"capacity overruns: {overruns}, occupancy counter mismatches: {mismatches}"
+        self.stdout.write(self.style.ERROR(report) if overruns or mismatches else self.style.SUCCESS(report))
+
+    def run(self, strategy, session, users, turf, field_size, offset, same_date, options):
+        book = retry_transient(strategy)
+        hold = options['hold_ms'] / 1000
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(len(users))
+
+        def worker(index, user):
+            # Each run uses fresh dates so the counters start empty
+            day = future_date(offset if same_date else offset + index)
+            mine = []
+            try:
+                start.wait()
+                for _ in range(options['bookings']):
+                    started = time.perf_counter()
+                    try:
+                        book(session.id, user.id, turf.id, field_size.id, day, 1, hold)
+                    except OperationalError as e:
+                        with lock:
+                            errors.append(e)
+                        continue
+                    mine.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(mine)
+
+        threads = [threading.Thread(target=worker, args=(index, user)) for index, user in enumerate(users)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(latencies, time.perf_counter() - started), len(errors)
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Turf.inventory import generate_inventory
+
+
+class Command(BaseCommand):
+    help = (
+        "Create open TurfSlot/BadmintonSlot rows from every turf's opening hours for the "
+        "next --days days. Existing slots are kept, so this is safe to run daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SLOT_INVENTORY_DAYS)
+
+    def handle(self, *args, **options):
+        count = generate_inventory(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Generated up to {count} open slots for the next {options['days']} days."))
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from Turf.benchmarks import (
+    IN_MEMORY_CHANNEL_LAYERS, scratch_database, make_users, make_tokens, make_turf, future_date, summarize,
+    count_double_bookings, count_capacity_overruns,
+)
+from Turf.models import SwimmingSession
+from Turf.slot_index import slot_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive many authenticated WebSocket clients through the full ASGI application "
+        "against a scratch database, then report throughput, latency and any double "
+        "bookings or swimming capacity overruns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=200, help="sockets open at the same time")
+        parser.add_argument('--messages', type=int, default=5, help="messages per client")
+        parser.add_argument('--hot-slots', type=int, default=1,
+                            help="distinct evening hours (up to 6) the turf bookings compete for (1 = maximum contention)")
+        parser.add_argument('--field-sizes', type=int, default=1)
+        parser.add_argument('--swimming', type=float, default=0.2, help="share of bookings for swimming")
+        parser.add_argument('--reads', type=float, default=0.3, help="share of get_available_sessions messages")
+        parser.add_argument('--capacity', type=int, default=20, help="capacity of each swimming session")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            users = make_users(options['clients'])
+            tokens = make_tokens(users)
+            turf, field_sizes = make_turf(options['field_sizes'])
+            SwimmingSession.objects.bulk_create(
+                SwimmingSession(start_time=f"{hour:02d}:00", end_time=f"{hour + 1:02d}:00", capacity=options['capacity'])
+                for hour in (6, 7)
+            )
+            sessions = list(SwimmingSession.objects.values_list('id', flat=True))
+            slot_index.clear()
+
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS,
+                                   SOCKET_RATE_LIMIT=None, SOCKET_USER_RATE_LIMIT=None):
+                # Imported here so the in-process application picks up the overridden settings
+                from Turf_management.asgi import application
+                latencies, outcomes, elapsed = asyncio.run(
+                    self.run(application, users, tokens, turf, field_sizes, sessions, options)
+                )
+
+            double_bookings = count_double_bookings()
+            overruns, mismatches = count_capacity_overruns()
+
+        everything = [latency for values in latencies.values() for latency in values]
+        stats = summarize(everything, elapsed)
+        self.stdout.write(
+            f"{options['clients']} clients, {stats['count']} messages in {elapsed:.1f}s: "
+            f"{stats['throughput']:.1f} msg/s, p50={stats['p50_ms']:.1f}ms "
+            f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+        )
+        for message_type, values in sorted(latencies.items()):
+            stats = summarize(values, elapsed)
+            self.stdout.write(
+                f"  {message_type}: {stats['count']} messages, p50={stats['p50_ms']:.1f}ms "
+                f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+            )
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f"  {outcome}: {count}")
+
+        report = (f"double bookings: {double_bookings}, capacity overruns: {overruns}, "
+                  f"occupancy counter mismatches: {mismatches}")
+        if double_bookings or overruns or mismatches:
+            self.stdout.write(self.style.ERROR(report))
+        else:
+            self.stdout.write(self.style.SUCCESS(report))
+
+    async def run(self, application, users, tokens, turf, field_sizes, sessions, options):
+        rng = random.Random(options['seed'])
+        day = future_date(7).isoformat()
+        latencies = defaultdict(list)
+        outcomes = Counter()
+        gate = asyncio.Semaphore(options['concurrency'])
+
+        def next_message():
+            roll = rng.random()
+            if roll < options['reads']:
+                return {'type': 'get_available_sessions', 'sports': 'Swimming', 'date': day}
+            if roll < options['reads'] + (1 - options['reads']) * options['swimming']:
+                return {
+                    'type': 'book_slot', 'sports': 'Swimming', 'turf_id': turf.id,
+                    'field_size_id': field_sizes[0].id, 'session_id': rng.choice(sessions),
+                    'date': day, 'number_of_people': rng.randint(1, 3),
+                }
+            # Hot evening slots, one hour each from 17:00
+            hour = 17 + rng.randrange(options['hot_slots']) % 6
+            return {
+                'type': 'book_slot', 'sports': 'Football', 'turf_id': turf.id,
+                'field_size_id': rng.choice(field_sizes).id, 'date': day,
+                'start_time': f"{hour:02d}:00", 'end_time': f"{hour + 1:02d}:00",
+            }
+
+        async def client(user):
+            messages = [next_message() for _ in range(options['messages'])]
+            async with gate:
+                communicator = WebsocketCommunicator(application, f"/ws/turf-slot/?token={tokens[user.id]}")
+                connected, _ = await communicator.connect(timeout=30)
+                if not connected:
+                    outcomes['connection rejected'] += 1
+                    return
+                try:
+                    for message in messages:
+                        label = message['type'] if message['type'] != 'book_slot' else f"book_slot {message['sports']}"
+                        started = time.perf_counter()
+                        await communicator.send_to(text_data=json.dumps(message))
+                        reply = json.loads(await communicator.receive_from(timeout=60))
+                        latencies[label].append(time.perf_counter() - started)
+                        if message['type'] == 'book_slot':
+                            outcomes[f"{label} {'booked' if reply.get('slot_id') else 'refused'}"] += 1
+                finally:
+                    await communicator.disconnect()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(user) for user in users))
+        return latencies, outcomes, time.perf_counter() - started
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from Turf.models import Turf
+from Turf.tasks import process_turf_image
+
+
+class Command(BaseCommand):
+    help = "Generate image variants for turfs that do not have them yet (or for all turfs with --all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="also rebuild turfs that already have variants")
+
+    def handle(self, *args, **options):
+        turfs = Turf.objects.exclude(image='')
+        if not options['all']:
+            turfs = turfs.filter(image_hash='')
+        count = 0
+        for turf_id in turfs.values_list('pk', flat=True).iterator():
+            process_turf_image(turf_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} turf images."))
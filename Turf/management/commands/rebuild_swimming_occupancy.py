@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from Turf.models import SwimmingOccupancy
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-session, per-date swimming occupancy counters from SwimmingSlot rows."
+
+    def handle(self, *args, **options):
+        SwimmingOccupancy.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {SwimmingOccupancy.objects.count()} swimming occupancy counters."
+        ))
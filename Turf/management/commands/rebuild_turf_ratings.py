@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from Turf.models import Turf
+
+
+class Command(BaseCommand):
+    help = "Recompute rating_sum, rating_count and rating for every turf from TurfRating rows."
+
+    def handle(self, *args, **options):
+        Turf.rebuild_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating counters for {Turf.objects.count()} turfs."))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from Turf.availability import invalidate_availability
+from Turf.constraints import SLOT_TABLES, add_overlap_constraint, find_overlaps, has_overlap_constraint
+from Turf.models import TurfSlot, BadmintonSlot
+from Turf.slot_index import interval_mask, slot_index
+
+MODELS = {TurfSlot._meta.db_table: TurfSlot, BadmintonSlot._meta.db_table: BadmintonSlot}
+
+
+class Command(BaseCommand):
+    help = (
+        "Report booked slots that overlap each other (left over from before migration 0014). "
+        "With --release, keep the earliest booking of each overlap, release the later ones "
+        "and install the overlap constraints, which migration 0014 cannot add while they exist."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--release', action='store_true',
+                            help="release the later overlapping bookings and add the missing constraints")
+
+    def handle(self, *args, **options):
+        found = 0
+        for table, name, with_sports in SLOT_TABLES:
+            model = MODELS[table]
+            with transaction.atomic():
+                overlaps = find_overlaps(connection, table, with_sports)
+                to_release = self.later_bookings(model, overlaps, with_sports)
+                found += len(to_release)
+                for slot in to_release:
+                    self.stdout.write(
+                        f"{table} #{slot.id}: user {slot.user_id}, turf {slot.turf_id}, field size "
+                        f"{slot.field_size_id}, {slot.date} {slot.start_time}-{slot.end_time} overlaps an earlier booking"
+                    )
+                if not options['release']:
+                    continue
+                if to_release:
+                    model.objects.filter(id__in=[slot.id for slot in to_release]).update(is_available=True, is_booked=False)
+                    for turf_id, date in {(slot.turf_id, slot.date) for slot in to_release}:
+                        transaction.on_commit(lambda turf_id=turf_id, date=date: invalidate_availability(turf_id, date))
+                    for slot in to_release:
+                        slot_index.invalidate(model, slot.turf_id, slot.field_size_id,
+                                              getattr(slot, 'sports', None), slot.date)
+                if connection.vendor in ('postgresql', 'sqlite') and not has_overlap_constraint(connection, name):
+                    add_overlap_constraint(connection, table, name, with_sports)
+                    self.stdout.write(f"Added {name}.")
+
+        if options['release']:
+            self.stdout.write(self.style.SUCCESS("Overlapping bookings released; overlap constraints are in place."))
+        elif found:
+            self.stdout.write("Run again with --release to release the bookings listed above and add the constraints.")
+        else:
+            self.stdout.write(self.style.SUCCESS("No overlapping bookings."))
+
+    @staticmethod
+    def later_bookings(model, overlaps, with_sports):
+        """
+        Of the bookings involved in `overlaps`, the ones to release so that the rest
+        do not overlap: the earliest booking (lowest id) of each conflict is kept.
+        """
+        ids = {slot_id for pair in overlaps for slot_id in pair}
+        kept = {}
+        released = []
+        for slot in model.objects.filter(id__in=ids).order_by('id'):
+            key = (slot.turf_id, slot.field_size_id, slot.date, getattr(slot, 'sports', None) if with_sports else None)
+            mask = interval_mask(slot.start_time, slot.end_time)
+            if kept.get(key, 0) & mask:
+                released.append(slot)
+            else:
+                kept[key] = kept.get(key, 0) | mask
+        return released
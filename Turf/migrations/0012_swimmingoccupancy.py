@@ -0,0 +1,43 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_occupancy(apps, schema_editor):
+    SwimmingSlot = apps.get_model('Turf', 'SwimmingSlot')
+    SwimmingOccupancy = apps.get_model('Turf', 'SwimmingOccupancy')
+    totals = (
+        SwimmingSlot.objects.filter(session__isnull=False)
+        .values('session_id', 'date')
+        .annotate(total=Sum('number_of_people'))
+        .order_by()
+    )
+    SwimmingOccupancy.objects.bulk_create(
+        SwimmingOccupancy(session_id=row['session_id'], date=row['date'], occupied=row['total'])
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Turf', '0011_remove_turf_sports_turf_sports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SwimmingOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('occupied', models.PositiveIntegerField(default=0)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='Turf.swimmingsession')),
+            ],
+            options={
+                'unique_together': {('session', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Turf', '0012_swimmingoccupancy'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='badmintonslot',
+            unique_together={('turf', 'field_size', 'date', 'start_time', 'end_time')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='turfslot',
+            unique_together={('turf', 'field_size', 'date', 'start_time', 'end_time')},
+        ),
+    ]
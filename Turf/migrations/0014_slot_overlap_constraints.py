@@ -0,0 +1,63 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+from Turf.constraints import (
+    SLOT_TABLES, add_overlap_constraint, find_overlaps, has_overlap_constraint, remove_overlap_constraint,
+)
+
+# Booked rows (is_available = false) of the same turf, field size (and sports,
+# for TurfSlot) may not overlap in time. PostgreSQL enforces this with an
+# exclusion constraint; SQLite, used for local development and tests, gets
+# triggers that raise a constraint error instead. On other backends the booking
+# paths lock the turf row and check for overlaps themselves
+# (Turf.constraints.enforce_no_overlap).
+#
+# Bookings made before this migration may already overlap (the old check never
+# caught them). The migration then stops with the offending rows;
+# `manage.py resolve_slot_overlaps --release` releases the later bookings and
+# installs the constraints, after which the migration can run again.
+
+
+def add_overlap_constraints(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    for table, name, with_sports in SLOT_TABLES:
+        if has_overlap_constraint(connection, name):
+            continue
+        overlaps = find_overlaps(connection, table, with_sports)
+        if overlaps:
+            raise RuntimeError(
+                f"{table} has {len(overlaps)} overlapping booked slot pairs, e.g. {overlaps[:20]}. "
+                f"Run `manage.py resolve_slot_overlaps` to list them and `manage.py resolve_slot_overlaps "
+                f"--release` to release the later bookings, then migrate again."
+            )
+        add_overlap_constraint(connection, table, name, with_sports)
+
+
+def remove_overlap_constraints(apps, schema_editor):
+    for table, name, _ in SLOT_TABLES:
+        remove_overlap_constraint(schema_editor.connection, table, name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Offers', '0001_initial'),
+        ('Turf', '0013_slot_unique_per_field_size'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='badmintonslot',
+            index=models.Index(condition=models.Q(('is_available', False)), fields=['turf', 'field_size', 'date', 'start_time', 'end_time'], name='badmintonslot_booked_ovl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turfslot',
+            index=models.Index(condition=models.Q(('is_available', False)), fields=['turf', 'field_size', 'sports', 'date', 'start_time', 'end_time'], name='turfslot_booked_overlap_idx'),
+        ),
+        migrations.RunPython(add_overlap_constraints, remove_overlap_constraints),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_counters(apps, schema_editor):
+    Turf = apps.get_model('Turf', 'Turf')
+    TurfRating = apps.get_model('Turf', 'TurfRating')
+    ratings = TurfRating.objects.filter(turf=OuterRef('pk')).order_by().values('turf')
+    Turf.objects.update(
+        rating_sum=Coalesce(Subquery(ratings.annotate(total=Sum('rating')).values('total')), 0),
+        rating_count=Coalesce(Subquery(ratings.annotate(total=Count('id')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Turf', '0014_slot_overlap_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turf',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='turf',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Turf', '0015_turf_rating_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turf',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='turf',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
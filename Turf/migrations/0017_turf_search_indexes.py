@@ -0,0 +1,44 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:48
+
+from django.db import migrations, models
+
+# Trigram indexes for TurfViewSet.search on PostgreSQL. They are built on
+# UPPER(column) because Django's icontains compiles to UPPER(col) LIKE UPPER(...)
+# and the search matches UPPER(col) % UPPER(q); pg_trgm serves both.
+TRIGRAM_INDEXES = [
+    ('turf_name_trgm_idx', 'name'),
+    ('turf_location_trgm_idx', 'location'),
+]
+
+
+def add_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON "Turf_turf" USING gin (UPPER("{column}") gin_trgm_ops)'
+        )
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Offers', '0001_initial'),
+        ('Turf', '0016_turf_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turf',
+            index=models.Index(fields=['rating'], name='turf_rating_idx'),
+        ),
+        migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:52
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Offers', '0001_initial'),
+        ('Turf', '0017_turf_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turf',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='turf',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='turf',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='turf',
+            index=models.Index(fields=['geohash'], name='turf_geohash_idx'),
+        ),
+    ]
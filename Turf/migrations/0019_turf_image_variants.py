@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Turf', '0018_turf_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turf',
+            name='image_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='turf',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-18 00:06
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Offers', '0001_initial'),
+        ('Turf', '0019_turf_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sports', models.CharField(choices=[('Cricket', 'Cricket'), ('Football', 'Football'), ('Badminton', 'Badminton')], max_length=256)),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('open_time', models.TimeField()),
+                ('close_time', models.TimeField()),
+                ('slot_minutes', models.PositiveIntegerField(default=60, validators=[django.core.validators.MinValueValidator(15)])),
+                ('price', models.DecimalField(decimal_places=2, default=2000, max_digits=6)),
+                ('advance_price', models.DecimalField(decimal_places=2, default=500, max_digits=6)),
+            ],
+            options={
+                'ordering': ['turf', 'field_size', 'weekday', 'open_time'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='badmintonslot',
+            index=models.Index(fields=['turf', 'date'], name='badmintonslot_turf_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turfslot',
+            index=models.Index(fields=['turf', 'date'], name='turfslot_turf_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='openinghours',
+            name='field_size',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Turf.fieldsize'),
+        ),
+        migrations.AddField(
+            model_name='openinghours',
+            name='turf',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours', to='Turf.turf'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 00:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Turf', '0020_slot_inventory'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='turfslot',
+            unique_together={('turf', 'field_size', 'sports', 'date', 'start_time', 'end_time')},
+        ),
+    ]
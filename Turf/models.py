@@ -1,4 +1,4 @@
-from django.db import models,transaction
+from django.db import models,transaction,connection
 from datetime import datetime, timedelta, time
 from Offers.models import Coupon
 from User.models import UserModel
@@ -7,7 +7,10 @@ from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Sum, Q, F, Count, OuterRef, Subquery, Func, Exists, FilteredRelation
+from django.db.models.functions import Coalesce, Greatest, Cast, NullIf
+from .caching import bump_catalogue
+from . import geo
 
 class Sports(models.Model):
     name = models.CharField(max_length=50)
@@ -25,24 +28,137 @@ class Facility(models.Model):
 class Turf(models.Model):
     name = models.CharField(max_length=255)
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Derived from latitude/longitude in save(); prefix ranges narrow /turfs/nearby/ to a few cells
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     image = models.ImageField(upload_to='turf_images/')
+    # Filled in by tasks.process_turf_image: sha256 of the image and {variant: {format: path}}
+    image_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     facilities = models.ManyToManyField(Facility)
     rating = models.FloatField(default=0.0)  
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     availble_offers = models.ManyToManyField(Coupon,null=True)
     sports = models.ManyToManyField(Sports, null=True, blank=True)
+    # Bumped on every change to the turf, its M2M relations or its rating (ETags)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
     def __str__(self):
         return self.name
 
+    class Meta:
+        # Text search indexes are PostgreSQL-specific and live in migration 0017
+        indexes = [
+            models.Index(fields=['rating'], name='turf_rating_idx'),
+            models.Index(fields=['geohash'], name='turf_geohash_idx'),
+        ]
+
+    # Maintained with UPDATE ... F() statements; a full save() must not overwrite them with stale values
+    COUNTER_FIELDS = {'rating', 'rating_sum', 'rating_count'}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'image' in field_names:
+            instance._stored_image = instance.__dict__['image']
+        return instance
+
+    def save(self, *args, **kwargs):
+        # New or replaced image: drop the old variants, signals queue the rebuild after commit
+        if self._state.adding:
+            self._image_changed = bool(self.image)
+        else:
+            self._image_changed = hasattr(self, '_stored_image') and (self.image.name or '') != (self._stored_image or '')
+        if self._image_changed:
+            self.image_hash = ''
+            self.image_variants = {}
+        self.geohash = geo.encode(self.latitude, self.longitude) \
+            if self.latitude is not None and self.longitude is not None else ''
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+                update_fields = [*update_fields, 'geohash']
+            if update_fields is not None and 'image' in update_fields:
+                update_fields = [*update_fields, 'image_hash', 'image_variants']
+            if update_fields is None:
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                ]
+            kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+        super().save(*args, **kwargs)
+        self._stored_image = self.image.name
+        bump_catalogue()
+
+    @staticmethod
+    def version_bump():
+        """
+        UPDATE kwargs that mark a turf as changed.
+        """
+        return {'version': F('version') + 1, 'updated_at': timezone.now()}
+
+    @classmethod
+    def touch(cls, pks):
+        """
+        Mark turfs as changed without saving them, e.g. after an M2M change.
+        """
+        cls.objects.filter(pk__in=pks).update(**cls.version_bump())
+        bump_catalogue()
+
+    @staticmethod
+    def average_rating_expression(rating_sum, rating_count):
+        """
+        rating_sum / rating_count rounded to 1 decimal place, 0.0 without ratings.
+        Single-argument ROUND on a float is portable (PostgreSQL has no ROUND(float, n)).
+        """
+        average_x10 = Cast(rating_sum, models.FloatField()) * 10 / NullIf(rating_count, 0)
+        return Coalesce(
+            Func(average_x10, function='ROUND', output_field=models.FloatField()) / 10.0,
+            0.0,
+        )
+
+    @classmethod
+    def adjust_rating(cls, turf_id, sum_delta, count_delta):
+        """
+        Apply a rating change to the counters and the derived average in one UPDATE.
+        """
+        rating_sum = F('rating_sum') + sum_delta
+        rating_count = F('rating_count') + count_delta
+        cls.objects.filter(pk=turf_id).update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=cls.average_rating_expression(rating_sum, rating_count),
+            **cls.version_bump(),
+        )
+        bump_catalogue()
+
+    @classmethod
+    def rebuild_ratings(cls, queryset=None):
+        """
+        Recompute rating_sum, rating_count and rating from TurfRating rows.
+        """
+        ratings = TurfRating.objects.filter(turf=OuterRef('pk')).order_by().values('turf')
+        (queryset if queryset is not None else cls.objects.all()).update(
+            rating_sum=Coalesce(Subquery(ratings.annotate(total=Sum('rating')).values('total')), 0),
+            rating_count=Coalesce(Subquery(ratings.annotate(total=Count('id')).values('total')), 0),
+        )
+        (queryset if queryset is not None else cls.objects.all()).update(
+            rating=cls.average_rating_expression(F('rating_sum'), F('rating_count')),
+            **cls.version_bump(),
+        )
+        bump_catalogue()
+
     def calculate_average_rating(self):
-        ratings = self.ratings.all()  
-        if ratings.exists():
-            average_rating = ratings.aggregate(models.Avg('rating'))['rating__avg']
-            return round(average_rating, 1)  # Round to 1 decimal place
+        if self.rating_count:
+            return round(self.rating_sum / self.rating_count, 1)  # Round to 1 decimal place
         return 0.0
 
     def update_rating(self):
-        self.rating = self.calculate_average_rating()
-        self.save()
+        Turf.rebuild_ratings(Turf.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=['rating_sum', 'rating_count', 'rating'])
 
 
 class TurfRating(models.Model):
@@ -60,10 +176,29 @@ class TurfRating(models.Model):
     class Meta:
         unique_together = ('user', 'turf')  
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what is stored so save() can apply only the difference
+        instance._stored_rating = (instance.__dict__.get('turf_id'), instance.__dict__.get('rating'))
+        return instance
 
-        self.turf.update_rating()
+    def save(self, *args, **kwargs):
+        stored = getattr(self, '_stored_rating', None)
+        if not self._state.adding and (stored is None or None in stored):
+            stored = TurfRating.objects.filter(pk=self.pk).values_list('turf_id', 'rating').first()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if stored is None:
+                Turf.adjust_rating(self.turf_id, self.rating, 1)
+            elif stored[0] == self.turf_id:
+                if stored[1] != self.rating:
+                    Turf.adjust_rating(self.turf_id, self.rating - stored[1], 0)
+            else:
+                Turf.adjust_rating(stored[0], -stored[1], -1)
+                Turf.adjust_rating(self.turf_id, self.rating, 1)
+        self._stored_rating = (self.turf_id, self.rating)
 
 
 class FieldSize(models.Model):
@@ -98,7 +233,18 @@ class TurfSlot(models.Model):
         return f"{self.turf.name} ({self.field_size.name}) - {self.date} {self.start_time} to {self.end_time}"
 
     class Meta:
-        unique_together = ('turf', 'date', 'start_time', 'end_time')
+        # Per sport, like the overlap constraint and claim_slot: each sport has its own slots
+        unique_together = ('turf', 'field_size', 'sports', 'date', 'start_time', 'end_time')
+        # Matches the overlap check; booked rows may not overlap (see migration 0014)
+        indexes = [
+            models.Index(
+                fields=['turf', 'field_size', 'sports', 'date', 'start_time', 'end_time'],
+                condition=Q(is_available=False),
+                name='turfslot_booked_overlap_idx',
+            ),
+            # Availability grid and generated inventory: every slot of a turf on a date
+            models.Index(fields=['turf', 'date'], name='turfslot_turf_date_idx'),
+        ]
 
     # Method to calculate the dynamic price of the slot
     def calculate_price(self):
@@ -115,6 +261,45 @@ class TurfSlot(models.Model):
 
         return total_price
  
+class SwimmingSessionQuerySet(models.QuerySet):
+    def with_remaining_capacity(self, date):
+        """
+        Annotate each session with the people booked and spots remaining on a date.
+        The date is part of the join, so each session matches at most one occupancy
+        counter and the query needs no GROUP BY.
+        """
+        return self.annotate(
+            occupancy_on_date=FilteredRelation('occupancy', condition=Q(occupancy__date=date)),
+        ).annotate(
+            booked_people=Coalesce(F('occupancy_on_date__occupied'), 0),
+        ).annotate(remaining=F('capacity') - F('booked_people'))
+
+    def available_on(self, date):
+        """
+        Sessions that still have at least one spot left on the given date.
+        """
+        return self.with_remaining_capacity(date).filter(remaining__gt=0)
+
+    def remaining_capacity_by_date(self, start_date, end_date):
+        """
+        Remaining capacity for every session and every date in [start_date, end_date],
+        as {(session_id, date): remaining}, from one read of the occupancy counters.
+        """
+        sessions = {session.id: session.capacity for session in self.only('id', 'capacity')}
+        booked = SwimmingOccupancy.objects.filter(
+            session_id__in=sessions, date__range=(start_date, end_date)
+        ).values_list('session_id', 'date', 'occupied')
+        booked = {(session_id, day): occupied for session_id, day, occupied in booked}
+
+        remaining = {}
+        day = start_date
+        while day <= end_date:
+            for session_id, capacity in sessions.items():
+                remaining[(session_id, day)] = capacity - booked.get((session_id, day), 0)
+            day += timedelta(days=1)
+        return remaining
+
+
 # Swimming Session Model
 class SwimmingSession(models.Model):
     start_time = models.TimeField()
@@ -122,6 +307,8 @@ class SwimmingSession(models.Model):
     capacity = models.PositiveIntegerField(default=20)
     price_per_person = models.DecimalField(max_digits=6, decimal_places=2, default=200.00)
 
+    objects = SwimmingSessionQuerySet.as_manager()
+
     def __str__(self):
         return f"Session from {self.start_time} to {self.end_time}"
 
@@ -143,10 +330,91 @@ class SwimmingSession(models.Model):
         """
         Calculates the remaining capacity for the session on a given date.
         """
-        total_people = SwimmingSlot.objects.filter(session=self, date=date).aggregate(
-            Sum('number_of_people')
-        )['number_of_people__sum'] or 0
-        return self.capacity - total_people
+        occupied = SwimmingOccupancy.objects.filter(session=self, date=date).values_list(
+            'occupied', flat=True
+        ).first() or 0
+        return self.capacity - occupied
+
+    def _claim(self, date, number_of_people):
+        return SwimmingOccupancy.objects.filter(
+            session=self, date=date, occupied__lte=self.capacity - number_of_people
+        ).update(occupied=F('occupied') + number_of_people)
+
+    def reserve(self, date, number_of_people):
+        """
+        Claim spots on a date with a conditional UPDATE of that date's counter row.
+        Only bookings for the same session and date contend; nothing locks the session.
+        Returns False when the session does not have enough room left.
+        """
+        if number_of_people > self.capacity:
+            return False
+        if self._claim(date, number_of_people):
+            return True
+        # No counter row yet (first booking for the date) or not enough room. Create the
+        # row if it is missing - a no-op when a concurrent booking just did - and try
+        # exactly once more; with the row in place the UPDATE's answer is final.
+        SwimmingOccupancy.objects.bulk_create([SwimmingOccupancy(session=self, date=date)], ignore_conflicts=True)
+        return bool(self._claim(date, number_of_people))
+
+    def release(self, date, number_of_people):
+        """
+        Give spots back on a date, e.g. when a booking is deleted.
+        """
+        SwimmingOccupancy.objects.filter(session=self, date=date).update(
+            occupied=Greatest(F('occupied') - number_of_people, 0)
+        )
+
+
+class CapacityExceeded(ValueError):
+    """
+    A swimming booking does not fit in what is left of its session on that date.
+    """
+
+
+class SwimmingOccupancy(models.Model):
+    """
+    Materialized number of people booked per session and date.
+    """
+    session = models.ForeignKey(SwimmingSession, related_name='occupancy', on_delete=models.CASCADE)
+    date = models.DateField()
+    occupied = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.session} on {self.date}: {self.occupied}/{self.session.capacity}"
+
+    class Meta:
+        unique_together = ('session', 'date')
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every counter from the SwimmingSlot rows. Safe while bookings come in:
+        the counters are locked before the totals are read, so a booking either
+        committed before the rebuild (and is counted) or waits for it to finish.
+        """
+        booked = (
+            SwimmingSlot.objects.filter(session_id=OuterRef('session_id'), date=OuterRef('date'))
+            .values('session_id', 'date')
+            .annotate(total=Sum('number_of_people'))
+            .values('total')
+        )
+        with transaction.atomic():
+            if connection.features.has_select_for_update:
+                list(cls.objects.select_for_update().values_list('id', flat=True))
+            cls.objects.update(occupied=Coalesce(Subquery(booked), 0))
+            # Bookings without a counter row (e.g. rows deleted by hand); a concurrent first
+            # booking for the same date creates its own row and wins the conflict
+            missing = (
+                SwimmingSlot.objects.filter(session__isnull=False)
+                .exclude(Exists(cls.objects.filter(session_id=OuterRef('session_id'), date=OuterRef('date'))))
+                .values('session_id', 'date')
+                .annotate(total=Sum('number_of_people'))
+                .order_by()
+            )
+            cls.objects.bulk_create(
+                [cls(session_id=row['session_id'], date=row['date'], occupied=row['total']) for row in missing],
+                ignore_conflicts=True,
+            )
 
 
 # Swimming Slot Model
@@ -158,6 +426,59 @@ class SwimmingSlot(models.Model):
     session = models.ForeignKey(SwimmingSession, on_delete=models.CASCADE, null=True)
     number_of_people = models.PositiveIntegerField()
 
+    COUNTED_FIELDS = ('session_id', 'date', 'number_of_people')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in field_names for name in cls.COUNTED_FIELDS):
+            instance._counted = tuple(getattr(instance, name) for name in cls.COUNTED_FIELDS)
+        return instance
+
+    def _booking(self):
+        return self.session_id, self._meta.get_field('date').to_python(self.date), self.number_of_people
+
+    def _counted_booking(self):
+        """
+        (session_id, date, number_of_people) as the occupancy counters hold this slot, or None for a new one.
+        """
+        if self._state.adding:
+            return None
+        if not hasattr(self, '_counted'):
+            self._counted = SwimmingSlot.objects.filter(pk=self.pk).values_list(*self.COUNTED_FIELDS).first()
+        return self._counted
+
+    def clean(self):
+        super().clean()
+        if self.session_id and self.number_of_people:
+            session_id, date, people = self._booking()
+            counted = self._counted_booking()
+            already = counted[2] if counted and counted[:2] == (session_id, date) else 0
+            if self.session.remaining_capacity(date) + already < people:
+                raise ValidationError("Not enough capacity left in this session on that date.")
+
+    def save(self, *args, **kwargs):
+        """
+        Every create, and every change of session, date or number of people, goes
+        through the session's occupancy counters. Raises CapacityExceeded when the
+        booking does not fit.
+        """
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            if update_fields is None or {'session', 'session_id', 'date', 'number_of_people'} & set(update_fields):
+                self.update_occupancy()
+            super().save(*args, **kwargs)
+        self._counted = self._booking()
+
+    def update_occupancy(self):
+        before, after = self._counted_booking(), self._booking()
+        if before == after:
+            return
+        if before and before[0]:
+            SwimmingSession(id=before[0]).release(before[1], before[2])
+        if after[0] and not self.session.reserve(after[1], after[2]):
+            raise CapacityExceeded("Not enough capacity to book the slot.")
+
     def available_capacity(self):
         """
         Check the remaining capacity for the session.
@@ -170,12 +491,14 @@ class SwimmingSlot(models.Model):
         """
         if number_of_people <= 0:
             raise ValueError("Number of people must be greater than zero.")
-        
-        if self.available_capacity() < number_of_people:
-            raise ValueError("Not enough capacity to book the slot.")
 
+        # save() claims the extra spots and raises CapacityExceeded if they do not fit
         self.number_of_people += number_of_people
-        self.save()
+        try:
+            self.save(update_fields=['number_of_people'])
+        except CapacityExceeded:
+            self.number_of_people -= number_of_people
+            raise
 
     def total_price(self):
         """
@@ -192,11 +515,13 @@ def book_slot_atomic(slot, people_count):
     with transaction.atomic():
         # Lock the slot to avoid race conditions
         slot = SwimmingSlot.objects.select_for_update().get(id=slot.id)
-        if slot.available_capacity() < people_count:
-            raise ValueError("Cannot book. Slot capacity exceeded.")
 
-        # Book the slot and update the number of people
-        slot.book_slot(people_count)
+        # Book the slot and update the number of people; the occupancy
+        # counter rejects the booking if the session is full
+        try:
+            slot.book_slot(people_count)
+        except ValueError:
+            raise ValueError("Cannot book. Slot capacity exceeded.")
 
 class BadmintonSlot(models.Model):
     user = models.ForeignKey(UserModel, on_delete=models.CASCADE, null=True)
@@ -215,7 +540,16 @@ class BadmintonSlot(models.Model):
         return f"{self.turf.name} ({self.field_size.name}) - {self.date} {self.start_time} to {self.end_time}"
 
     class Meta:
-        unique_together = ('turf', 'date', 'start_time', 'end_time')
+        unique_together = ('turf', 'field_size', 'date', 'start_time', 'end_time')
+        # Matches the overlap check; booked rows may not overlap (see migration 0014)
+        indexes = [
+            models.Index(
+                fields=['turf', 'field_size', 'date', 'start_time', 'end_time'],
+                condition=Q(is_available=False),
+                name='badmintonslot_booked_ovl_idx',
+            ),
+            models.Index(fields=['turf', 'date'], name='badmintonslot_turf_date_idx'),
+        ]
 
     # Method to calculate the dynamic price of the slot
     def calculate_price(self):
@@ -231,4 +565,54 @@ class BadmintonSlot(models.Model):
             total_price -= self.coupon.discount_amount  
 
 
-        return total_price
\ No newline at end of file
+        return total_price
+
+class OpeningHours(models.Model):
+    """
+    When a field of a turf can be booked on a weekday, and in slots of what length.
+    `manage.py generate_slots` turns these into open TurfSlot/BadmintonSlot rows.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'),
+        (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    ]
+    SPORTS_CHOICES = Sports_CHOICE + [('Badminton', 'Badminton')]
+
+    turf = models.ForeignKey(Turf, related_name='opening_hours', on_delete=models.CASCADE)
+    field_size = models.ForeignKey(FieldSize, on_delete=models.CASCADE)
+    sports = models.CharField(max_length=256, choices=SPORTS_CHOICES)
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    open_time = models.TimeField()
+    close_time = models.TimeField()
+    slot_minutes = models.PositiveIntegerField(default=60, validators=[MinValueValidator(15)])
+    price = models.DecimalField(max_digits=6, decimal_places=2, default=2000)
+    advance_price = models.DecimalField(max_digits=6, decimal_places=2, default=500)
+
+    def __str__(self):
+        return f"{self.turf.name} ({self.field_size.name}) {self.sports} {self.get_weekday_display()} {self.open_time}-{self.close_time}"
+
+    class Meta:
+        ordering = ['turf', 'field_size', 'weekday', 'open_time']
+
+    @property
+    def slot_model(self):
+        return BadmintonSlot if self.sports == 'Badminton' else TurfSlot
+
+    def clean(self):
+        super().clean()
+        if self.close_time <= self.open_time:
+            raise ValidationError("Closing time must be after opening time.")
+
+    def slot_times(self):
+        """
+        (start_time, end_time) of every whole slot between opening and closing time.
+        """
+        day = datetime.min.date()
+        start = datetime.combine(day, self.open_time)
+        close = datetime.combine(day, self.close_time)
+        step = timedelta(minutes=self.slot_minutes)
+        times = []
+        while start + step <= close:
+            times.append((start.time(), (start + step).time()))
+            start += step
+        return times
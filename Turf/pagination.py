@@ -0,0 +1,11 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TurfCursorPagination(CursorPagination):
+    """
+    Stable cursor pages over the turf directory; ?page_size= up to max_page_size.
+    """
+    ordering = 'id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,91 @@
+"""
+JSON schemas for TurfSlotConsumer messages, compiled once at import time with
+fastjsonschema so each incoming message is checked by generated Python code.
+"""
+import fastjsonschema
+
+# Largest batch accepted by a single book_slots message
+BOOK_SLOTS_MAX = 50
+
+ID = {'anyOf': [{'type': 'integer', 'minimum': 1}, {'type': 'string', 'pattern': '^[0-9]+$'}]}
+DATE = {'type': 'string', 'pattern': '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'}
+TIME = {'type': 'string', 'pattern': '^[0-9]{2}:[0-9]{2}$'}
+PEOPLE = {'anyOf': [{'type': 'integer', 'minimum': 1}, {'type': 'string', 'pattern': '^[0-9]+$'}]}
+TIMED_SPORTS = ['Cricket', 'Football', 'Badminton']
+
+TIMED_SLOT = {
+    'type': 'object',
+    'properties': {
+        'sports': {'enum': TIMED_SPORTS},
+        'turf_id': ID,
+        'field_size_id': ID,
+        'date': DATE,
+        'start_time': TIME,
+        'end_time': TIME,
+    },
+    'required': ['turf_id', 'field_size_id', 'date', 'start_time', 'end_time'],
+}
+
+MESSAGE_SCHEMAS = {
+    'subscribe': {
+        'type': 'object',
+        'properties': {'turf_id': ID, 'date': DATE},
+        'required': ['turf_id', 'date'],
+    },
+    'book_slot': {
+        'type': 'object',
+        'properties': {
+            'sports': {'enum': [*TIMED_SPORTS, 'Swimming']},
+            'session_id': ID,
+            'number_of_people': PEOPLE,
+        },
+        'required': ['sports'],
+        'if': {'properties': {'sports': {'const': 'Swimming'}}},
+        'then': {
+            'properties': {'turf_id': ID, 'field_size_id': ID, 'date': DATE},
+            'required': ['session_id', 'turf_id', 'field_size_id', 'date'],
+        },
+        'else': TIMED_SLOT,
+    },
+    'book_slots': {
+        'type': 'object',
+        'properties': {
+            'sports': {'enum': TIMED_SPORTS},
+            'mode': {'enum': ['all', 'partial']},
+            'slots': {'type': 'array', 'minItems': 1, 'maxItems': BOOK_SLOTS_MAX, 'items': TIMED_SLOT},
+        },
+        'required': ['slots'],
+    },
+    'claim_slot': {
+        'type': 'object',
+        'properties': {'sports': {'enum': TIMED_SPORTS}, 'slot_id': ID},
+        'required': ['sports', 'slot_id'],
+    },
+    'get_available_sessions': {
+        'type': 'object',
+        'properties': {'sports': {'const': 'Swimming'}, 'date': DATE},
+        'required': ['sports', 'date'],
+    },
+}
+MESSAGE_SCHEMAS['unsubscribe'] = MESSAGE_SCHEMAS['subscribe']
+
+ENVELOPE = {
+    'type': 'object',
+    'properties': {'type': {'enum': sorted(MESSAGE_SCHEMAS)}},
+    'required': ['type'],
+}
+
+_validate_envelope = fastjsonschema.compile(ENVELOPE)
+_validators = {name: fastjsonschema.compile(schema) for name, schema in MESSAGE_SCHEMAS.items()}
+
+
+def validate_message(data):
+    """
+    Return an error message for an invalid client message, or None if it is valid.
+    """
+    try:
+        _validate_envelope(data)
+        _validators[data['type']](data)
+    except fastjsonschema.JsonSchemaValueException as e:
+        return e.message
+    return None
@@ -0,0 +1,122 @@
+import heapq
+
+from django.db import connection
+from django.db.models import BooleanField, Case, Exists, F, FloatField, Func, OuterRef, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+from . import geo
+from .models import Turf
+
+
+class TrigramMatch(Func):
+    """
+    pg_trgm's `a % b` (similarity above pg_trgm.similarity_threshold); can use a GIN trigram index.
+    """
+    arg_joiner = ' %% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+class TrigramSimilarity(Func):
+    function = 'SIMILARITY'
+    output_field = FloatField()
+
+
+def parse_ids(value):
+    """
+    '1,2,3' -> [1, 2, 3]; raises ValueError on anything that is not an integer.
+    """
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def filter_turfs(queryset, params):
+    """
+    Apply ?sports= (any of the ids), ?facilities= (all of the ids) and ?min_rating= filters.
+    M2M filters are EXISTS subqueries on the through tables, so no DISTINCT is needed.
+    """
+    if params.get('sports'):
+        queryset = queryset.filter(Exists(Turf.sports.through.objects.filter(
+            turf_id=OuterRef('pk'), sports_id__in=parse_ids(params['sports'])
+        )))
+    if params.get('facilities'):
+        for facility_id in parse_ids(params['facilities']):
+            queryset = queryset.filter(Exists(Turf.facilities.through.objects.filter(
+                turf_id=OuterRef('pk'), facility_id=facility_id
+            )))
+    if params.get('min_rating'):
+        queryset = queryset.filter(rating__gte=float(params['min_rating']))
+    return queryset
+
+
+def search_turfs(queryset, text):
+    """
+    Prefix and fuzzy search on name and location, best matches first.
+
+    PostgreSQL uses pg_trgm against the UPPER(name) / UPPER(location) trigram
+    indexes created in migration 0017; other databases fall back to
+    case-insensitive prefix/substring matching.
+    """
+    text = text.strip()
+    if not text:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        needle = Upper(Value(text))
+        return queryset.filter(
+            Q(name__icontains=text) | Q(location__icontains=text)
+            | TrigramMatch(Upper(F('name')), needle) | TrigramMatch(Upper(F('location')), needle)
+        ).annotate(
+            relevance=Greatest(
+                TrigramSimilarity(Upper(F('name')), needle),
+                TrigramSimilarity(Upper(F('location')), needle),
+            ),
+        ).order_by('-relevance', '-rating', 'id')
+
+    prefix = Q(name__istartswith=text) | Q(location__istartswith=text)
+    return queryset.filter(
+        prefix | Q(name__icontains=text) | Q(location__icontains=text)
+    ).annotate(
+        relevance=Case(When(prefix, then=Value(1.0)), default=Value(0.0), output_field=FloatField()),
+    ).order_by('-relevance', '-rating', 'id')
+
+
+def prefix_range(prefix):
+    """
+    [low, high) string bounds matching every value that starts with prefix; unlike
+    LIKE 'prefix%' a range can use a plain btree index on every database.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def nearby_turfs(queryset, latitude, longitude, radius_km, limit):
+    """
+    The `limit` turfs closest to the point within radius_km, as (turf, distance_km) pairs.
+
+    SQL narrows the candidates to the geohash cells covering the bounding box and
+    to the box itself; only (id, latitude, longitude) of those rows is fetched,
+    ranked by exact haversine distance in Python, and the winners loaded in one query.
+    """
+    min_lat, max_lat, min_lng, max_lng = geo.bounding_box(latitude, longitude, radius_km)
+    candidates = queryset.filter(latitude__range=(min_lat, max_lat))
+    if min_lng < -180:
+        candidates = candidates.filter(Q(longitude__gte=min_lng + 360) | Q(longitude__lte=max_lng))
+    elif max_lng > 180:
+        candidates = candidates.filter(Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng - 360))
+    elif (min_lng, max_lng) != (-180.0, 180.0):
+        candidates = candidates.filter(longitude__range=(min_lng, max_lng))
+    else:
+        candidates = candidates.filter(longitude__isnull=False)
+
+    cells = geo.covering_cells(min_lat, max_lat, min_lng, max_lng)
+    if cells:
+        in_cells = Q()
+        for cell in cells:
+            low, high = prefix_range(cell)
+            in_cells |= Q(geohash__gte=low, geohash__lt=high)
+        candidates = candidates.filter(in_cells)
+
+    rows = candidates.prefetch_related(None).order_by().values_list('pk', 'latitude', 'longitude')
+    distances = ((geo.haversine(latitude, longitude, lat, lng), pk) for pk, lat, lng in rows)
+    nearest = heapq.nsmallest(limit, (item for item in distances if item[0] <= radius_km))
+    turfs = queryset.in_bulk([pk for _, pk in nearest])
+    return [(turfs[pk], distance) for distance, pk in nearest if pk in turfs]
@@ -1,16 +1,55 @@
 from rest_framework import serializers
+from django.core.files.storage import default_storage
 from .models import Turf,Facility,FieldSize
 from datetime import datetime,time
 from decimal import Decimal
 from User.models import UserModel
 
-class TurfSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """
+    Field names from a ?fields=name,location,rating query parameter, or None for all fields.
+    """
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Drops every field not listed in ?fields= from the serialized output.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class TurfSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     facilities = serializers.PrimaryKeyRelatedField(queryset=Facility.objects.all(), many=True)
+    image_variants = serializers.SerializerMethodField()
     class Meta:
         model = Turf
-        fields = ['name', 'location', 'image', 'facilities', 'rating','availble_offers','sports' ]
+        fields = ['id', 'name', 'location', 'latitude', 'longitude', 'image', 'image_variants', 'facilities', 'rating','availble_offers','sports' ]
         read_only_fields = ['rating']
 
+    def get_image_variants(self, turf):
+        """
+        {variant: {format: url}} for the resized copies of the image; empty until they are generated.
+        """
+        request = self.context.get('request')
+        urls = {}
+        for name, formats in turf.image_variants.items():
+            urls[name] = {}
+            for extension, path in formats.items():
+                url = default_storage.url(path)
+                urls[name][extension] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
     def create(self, validated_data):
         facilities_data = validated_data.pop('facilities')
         
@@ -0,0 +1,130 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .broadcast import broadcaster, slot_delta
+from .availability import invalidate_availability
+from .caching import bump_catalogue
+from .models import Turf, TurfRating, TurfSlot, BadmintonSlot, SwimmingSlot, SwimmingSession
+from .slot_index import slot_index
+from .tasks import process_turf_image
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=TurfSlot)
+@receiver(post_save, sender=BadmintonSlot)
+def update_slot_index(sender, instance, created, **kwargs):
+    """
+    Keep the in-process slot index warm on new bookings, drop the key otherwise.
+    """
+    if created and not instance.is_available:
+        slot_index.add_on_commit(instance)
+    else:
+        slot_index.invalidate(sender, instance.turf_id, instance.field_size_id,
+                              getattr(instance, 'sports', None), instance.date)
+
+
+@receiver(post_delete, sender=TurfSlot)
+@receiver(post_delete, sender=BadmintonSlot)
+def invalidate_slot_index(sender, instance, **kwargs):
+    slot_index.invalidate(sender, instance.turf_id, instance.field_size_id,
+                          getattr(instance, 'sports', None), instance.date)
+
+
+@receiver(post_delete, sender=SwimmingSlot)
+def release_swimming_capacity(sender, instance, **kwargs):
+    """
+    Give the spots of a deleted swimming booking back to its session.
+    """
+    # What the counters hold for the slot, which may differ from unsaved edits
+    session_id, date, people = getattr(instance, '_counted', None) or instance._booking()
+    if session_id:
+        SwimmingSession(id=session_id).release(date, people)
+
+
+def publish_slot_change(slot, op):
+    """
+    Once the transaction commits, drop the cached availability grid for the slot's
+    turf and date and queue an availability delta for its group.
+    """
+    delta = slot_delta(slot, op)
+    turf_id, date = slot.turf_id, slot.date
+
+    def publish():
+        invalidate_availability(turf_id, date)
+        broadcaster.publish(turf_id, date, delta)
+
+    transaction.on_commit(publish)
+
+
+@receiver(post_save, sender=TurfSlot)
+@receiver(post_save, sender=BadmintonSlot)
+def broadcast_slot_saved(sender, instance, created, **kwargs):
+    if created and instance.is_available:
+        # A new open slot changes the grid but is not news for booking subscribers
+        turf_id, date = instance.turf_id, instance.date
+        transaction.on_commit(lambda: invalidate_availability(turf_id, date))
+        return
+    publish_slot_change(instance, 'freed' if instance.is_available else 'booked')
+
+
+@receiver(post_save, sender=SwimmingSlot)
+def broadcast_swimming_slot_saved(sender, instance, created, **kwargs):
+    publish_slot_change(instance, 'booked' if created else 'updated')
+
+
+@receiver(post_delete, sender=TurfSlot)
+@receiver(post_delete, sender=BadmintonSlot)
+@receiver(post_delete, sender=SwimmingSlot)
+def broadcast_slot_deleted(sender, instance, **kwargs):
+    publish_slot_change(instance, 'freed')
+
+
+@receiver(post_delete, sender=TurfRating)
+def remove_rating(sender, instance, **kwargs):
+    """
+    Take a deleted rating out of its turf's counters (also covers queryset and cascade deletes).
+    """
+    Turf.adjust_rating(instance.turf_id, -instance.rating, -1)
+
+
+@receiver(m2m_changed, sender=Turf.facilities.through)
+@receiver(m2m_changed, sender=Turf.availble_offers.through)
+@receiver(m2m_changed, sender=Turf.sports.through)
+def touch_turf_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Bump the version of turfs whose facilities, offers or sports changed.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Turf.touch([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        Turf.touch(pk_set)
+    elif action == 'pre_clear':
+        # Reverse clear, e.g. facility.turf_set.clear(): the links are still there to look up
+        Turf.touch(sender.objects.filter(**{f"{type(instance)._meta.model_name}": instance}).values('turf_id'))
+
+
+@receiver(post_save, sender=Turf)
+def queue_image_processing(sender, instance, **kwargs):
+    if getattr(instance, '_image_changed', False) and instance.image:
+        turf_id = instance.pk
+        transaction.on_commit(lambda: enqueue_image_processing(turf_id))
+
+
+def enqueue_image_processing(turf_id):
+    """
+    Queue the variants build without blocking on (or failing the save over) an
+    unreachable broker; `manage.py process_turf_images` picks up what was missed.
+    """
+    try:
+        process_turf_image.apply_async((turf_id,), retry=False)
+    except Exception as e:
+        logger.error(f"Could not queue image processing for turf {turf_id}: {e}")
+
+
+@receiver(post_delete, sender=Turf)
+def turf_deleted(sender, instance, **kwargs):
+    bump_catalogue()
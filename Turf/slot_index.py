@@ -0,0 +1,185 @@
+import threading
+import time as clock
+import uuid
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(value):
+    """
+    Convert a time object or an 'HH:MM' string to minutes since midnight.
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%H:%M").time()
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    return int(value)
+
+
+def interval_mask(start, end):
+    """
+    Bitmap with one bit per minute in [start, end).
+    """
+    start = max(0, min(to_minutes(start), MINUTES_PER_DAY))
+    end = max(0, min(to_minutes(end), MINUTES_PER_DAY))
+    if end <= start:
+        return 0
+    return (1 << end) - (1 << start)
+
+
+class SlotIntervalIndex:
+    """
+    Per-process index of booked intervals keyed by (model, turf, field size, sports, date).
+
+    Each key holds a minute-resolution bitmap of the bookings for that day, loaded
+    from the database the first time it is needed and kept warm until it expires
+    or is invalidated. A miss falls through to the database constraints. A warm
+    hit rejects the request without a query as long as the key's version in the
+    shared cache still matches the one read before the bitmap was loaded; every
+    write that can free a slot bumps that version on commit. Invalidations only
+    reach other processes when CACHE_URL points to a shared cache (Redis or
+    Memcached) - with the default local-memory cache each process only sees its
+    own.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = settings.SLOT_INDEX_TTL if ttl is None else ttl
+        self._masks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model, turf_id, field_size_id, sports, date):
+        return (model._meta.label_lower, int(turf_id), int(field_size_id), sports or None, str(date))
+
+    @staticmethod
+    def version_key(key):
+        return 'slot-index:' + ':'.join(str(part) for part in key)
+
+    def _version(self, key):
+        version_key = self.version_key(key)
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, uuid.uuid4().hex, self.ttl * 2)
+            version = cache.get(version_key, '')
+        return version
+
+    async def _aversion(self, key):
+        version_key = self.version_key(key)
+        version = await cache.aget(version_key)
+        if version is None:
+            await cache.aadd(version_key, uuid.uuid4().hex, self.ttl * 2)
+            version = await cache.aget(version_key, '')
+        return version
+
+    def _booked(self, model, turf_id, field_size_id, sports, date):
+        filters = {
+            'turf_id': turf_id,
+            'field_size_id': field_size_id,
+            'date': date,
+            'is_available': False,
+        }
+        if sports:
+            filters['sports'] = sports
+        return model.objects.filter(**filters).values_list('start_time', 'end_time')
+
+    def _cached(self, key, now):
+        with self._lock:
+            entry = self._masks.get(key)
+            if entry and now - entry[0] < self.ttl:
+                return entry[1:]
+        return None, None
+
+    def _store(self, key, now, mask, version):
+        with self._lock:
+            self._masks[key] = (now, mask, version)
+        return mask
+
+    def load(self, model, turf_id, field_size_id, sports, date):
+        """
+        Read the bookings of a key from the database and keep the bitmap warm.
+        The version is read first, so a slot freed during the load still
+        invalidates the bitmap.
+        """
+        key = self.key(model, turf_id, field_size_id, sports, date)
+        version = self._version(key)
+        mask = 0
+        for start_time, end_time in self._booked(model, turf_id, field_size_id, sports, date):
+            mask |= interval_mask(start_time, end_time)
+        return self._store(key, clock.monotonic(), mask, version)
+
+    async def aload(self, model, turf_id, field_size_id, sports, date):
+        key = self.key(model, turf_id, field_size_id, sports, date)
+        version = await self._aversion(key)
+        mask = 0
+        async for start_time, end_time in self._booked(model, turf_id, field_size_id, sports, date):
+            mask |= interval_mask(start_time, end_time)
+        return self._store(key, clock.monotonic(), mask, version)
+
+    def overlaps(self, model, turf_id, field_size_id, sports, date, start, end):
+        """
+        Return True when [start, end) overlaps a booking in the database. A warm miss
+        answers without a query, a warm hit with one cache read of the key's version;
+        a cold or outdated key reads the key's bookings.
+        """
+        requested = interval_mask(start, end)
+        key = self.key(model, turf_id, field_size_id, sports, date)
+        mask, version = self._cached(key, clock.monotonic())
+        if mask is not None:
+            if not mask & requested:
+                return False
+            if version == cache.get(self.version_key(key)):
+                return True
+        return bool(self.load(model, turf_id, field_size_id, sports, date) & requested)
+
+    async def aoverlaps(self, model, turf_id, field_size_id, sports, date, start, end):
+        requested = interval_mask(start, end)
+        key = self.key(model, turf_id, field_size_id, sports, date)
+        mask, version = self._cached(key, clock.monotonic())
+        if mask is not None:
+            if not mask & requested:
+                return False
+            if version == await cache.aget(self.version_key(key)):
+                return True
+        return bool(await self.aload(model, turf_id, field_size_id, sports, date) & requested)
+
+    def add(self, model, turf_id, field_size_id, sports, date, start, end):
+        """
+        Mark [start, end) as booked on a warm key; cold keys are left to load lazily.
+        Call it once the booking has committed (see add_on_commit).
+        """
+        key = self.key(model, turf_id, field_size_id, sports, date)
+        with self._lock:
+            entry = self._masks.get(key)
+            if entry:
+                self._masks[key] = (entry[0], entry[1] | interval_mask(start, end), entry[2])
+
+    def add_on_commit(self, slot):
+        """
+        Add a booked TurfSlot or BadmintonSlot once the current transaction commits,
+        so a rolled-back booking never leaves an interval behind.
+        """
+        args = (type(slot), slot.turf_id, slot.field_size_id, getattr(slot, 'sports', None),
+                slot.date, slot.start_time, slot.end_time)
+        transaction.on_commit(lambda: self.add(*args))
+
+    def invalidate(self, model, turf_id, field_size_id, sports, date):
+        """
+        Drop the key in this process now and, once the current transaction commits,
+        bump its shared version so other processes reload it on their next hit.
+        """
+        key = self.key(model, turf_id, field_size_id, sports, date)
+        with self._lock:
+            self._masks.pop(key, None)
+        transaction.on_commit(lambda: cache.set(self.version_key(key), uuid.uuid4().hex, self.ttl * 2))
+
+    def clear(self):
+        with self._lock:
+            self._masks.clear()
+
+
+slot_index = SlotIntervalIndex()
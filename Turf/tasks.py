@@ -0,0 +1,36 @@
+import logging
+
+from celery import shared_task
+from PIL import UnidentifiedImageError
+
+from .caching import bump_catalogue
+from .images import build_variants, content_hash
+from .models import Turf
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
+def process_turf_image(turf_id):
+    """
+    Generate the thumbnail/WebP variants of a turf's current image and record them.
+    """
+    turf = Turf.objects.filter(pk=turf_id).only('id', 'image', 'image_hash').first()
+    if turf is None or not turf.image:
+        return
+    image_name = turf.image.name
+    try:
+        with turf.image.open('rb') as file:
+            image_hash = content_hash(file)
+            variants = build_variants(file, image_hash)
+    except (UnidentifiedImageError, FileNotFoundError) as e:
+        logger.error(f"Cannot process image {image_name} of turf {turf_id}: {e}")
+        return
+
+    # Skip the write if the image was replaced while this task was running; its own task follows
+    updated = Turf.objects.filter(pk=turf_id, image=image_name).update(
+        image_hash=image_hash, image_variants=variants, **Turf.version_bump()
+    )
+    if updated:
+        bump_catalogue()
+    logger.debug(f"Processed image {image_name} of turf {turf_id} ({image_hash[:12]})")
@@ -1,3 +1,823 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import time as clock
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+from asgiref.sync import async_to_sync
+from celery import Celery
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from Turf_management.celery import app as celery_app
+from User.models import UserModel
+from . import geo
+from .broadcast import AvailabilityBroadcaster, availability_group, slot_delta
+from .caching import CATALOGUE_MODIFIED_KEY
+from .constraints import SLOT_TABLES, has_overlap_constraint, remove_overlap_constraint
+from .consumers import TurfSlotConsumer
+from .images import build_variants, content_hash
+from .inventory import claim_slot, generate_inventory
+from .models import (
+    BadmintonSlot, CapacityExceeded, Facility, FieldSize, OpeningHours, Sports, SwimmingOccupancy, SwimmingSession,
+    SwimmingSlot, Turf, TurfRating, TurfSlot,
+)
+from .schemas import BOOK_SLOTS_MAX, validate_message
+from .signals import enqueue_image_processing
+from .slot_index import SlotIntervalIndex, interval_mask, slot_index
+from .tasks import process_turf_image
+from .throttle import TokenBucket, user_bucket
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class SlotTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserModel.objects.create_user('01700000001')
+        cls.other = UserModel.objects.create_user('01700000002')
+        cls.turf = Turf.objects.create(name='Arena', location='Dhaka', image='turf_images/arena.jpg')
+        cls.field_size = FieldSize.objects.create(name='5v5')
+        cls.day = date.today() + timedelta(days=1)
+
+    def book(self, model, start, end, user=None, **fields):
+        return model.objects.create(
+            user=user or self.user, turf=self.turf, field_size=self.field_size, date=self.day,
+            start_time=start, end_time=end, is_available=False, is_booked=True, **fields,
+        )
+
+    def open_slot(self, model, start, end, **fields):
+        return model.objects.create(
+            turf=self.turf, field_size=self.field_size, date=self.day, start_time=start, end_time=end, **fields,
+        )
+
+
+class SlotIndexTests(SlotTestCase):
+    def setUp(self):
+        cache.clear()
+        slot_index.clear()
+
+    def overlaps(self, start, end, sports='Football'):
+        return slot_index.overlaps(TurfSlot, self.turf.id, self.field_size.id, sports, self.day, start, end)
+
+    def test_interval_mask_covers_half_open_ranges(self):
+        self.assertEqual(interval_mask('10:00', '10:03'), 0b111 << 600)
+        self.assertFalse(interval_mask('10:00', '11:00') & interval_mask('11:00', '12:00'))
+        self.assertEqual(interval_mask('11:00', '10:00'), 0)
+
+    def test_warm_miss_answers_without_a_query(self):
+        self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        self.assertTrue(self.overlaps('10:30', '11:30'))
+        with self.assertNumQueries(0):
+            self.assertFalse(self.overlaps('11:00', '12:00'))
+            self.assertFalse(self.overlaps('09:00', '10:00'))
+
+    def test_warm_hit_answers_without_a_query(self):
+        self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        self.assertTrue(self.overlaps('10:00', '11:00'))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.overlaps('10:30', '11:30'))
+
+    def test_freed_slots_invalidate_other_processes(self):
+        other = SlotIntervalIndex()
+        slot = self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        self.assertTrue(other.overlaps(TurfSlot, self.turf.id, self.field_size.id, 'Football', self.day, '10:00', '11:00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            slot.is_available = True
+            slot.save()
+        self.assertFalse(other.overlaps(TurfSlot, self.turf.id, self.field_size.id, 'Football', self.day, '10:00', '11:00'))
+
+    def test_bookings_are_added_on_commit_only(self):
+        self.assertFalse(self.overlaps('10:00', '11:00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                self.book(TurfSlot, '10:00', '11:00', sports='Football')
+                raise IntegrityError
+        with self.assertNumQueries(0):
+            self.assertFalse(self.overlaps('10:00', '11:00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        with self.assertNumQueries(0):
+            self.assertTrue(self.overlaps('10:30', '11:30'))
+
+    def test_deleting_a_booking_drops_the_key(self):
+        slot = self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        self.assertTrue(self.overlaps('10:00', '11:00'))
+        slot.delete()
+        self.assertFalse(self.overlaps('10:00', '11:00'))
+
+
+class SwimmingAvailabilityTests(SlotTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.morning = SwimmingSession.objects.create(start_time='06:00', end_time='07:00', capacity=2)
+        cls.evening = SwimmingSession.objects.create(start_time='18:00', end_time='19:00', capacity=2)
+
+    def test_only_bookings_on_the_date_count(self):
+        later = self.day + timedelta(days=1)
+        self.assertTrue(self.morning.reserve(self.day, 2))
+        self.assertTrue(self.evening.reserve(self.day, 1))
+        self.assertTrue(self.evening.reserve(later, 2))
+        with self.assertNumQueries(1):
+            remaining = {
+                session.id: (session.booked_people, session.remaining)
+                for session in SwimmingSession.objects.with_remaining_capacity(self.day)
+            }
+        self.assertEqual(remaining, {self.morning.id: (2, 0), self.evening.id: (1, 1)})
+        self.assertEqual(list(SwimmingSession.objects.available_on(self.day)), [self.evening])
+        self.assertEqual(list(SwimmingSession.objects.available_on(later)), [self.morning])
+
+    def test_sessions_without_bookings_are_available(self):
+        self.assertEqual(list(SwimmingSession.objects.available_on(self.day)), [self.morning, self.evening])
+
+    def test_date_is_joined_without_grouping(self):
+        sql = str(SwimmingSession.objects.available_on(self.day).query)
+        self.assertIn('LEFT OUTER JOIN', sql)
+        self.assertNotIn('GROUP BY', sql)
+
+
+class SwimmingReserveTests(SlotTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.session = SwimmingSession.objects.create(start_time='06:00', end_time='07:00', capacity=3)
+
+    def occupied(self):
+        return SwimmingOccupancy.objects.get(session=self.session, date=self.day).occupied
+
+    def swim(self, people, **fields):
+        return SwimmingSlot.objects.create(
+            user=self.user, turf=self.turf, session=self.session, date=fields.pop('date', self.day),
+            number_of_people=people, **fields,
+        )
+
+    def test_reserve_stops_at_capacity(self):
+        self.assertTrue(self.session.reserve(self.day, 2))
+        self.assertFalse(self.session.reserve(self.day, 2))
+        self.assertTrue(self.session.reserve(self.day, 1))
+        self.assertFalse(self.session.reserve(self.day, 1))
+        self.assertEqual(self.occupied(), 3)
+        self.assertEqual(self.session.remaining_capacity(self.day), 0)
+
+    def test_reserve_refuses_more_than_capacity(self):
+        self.assertFalse(self.session.reserve(self.day, 4))
+        self.assertEqual(self.session.remaining_capacity(self.day), 3)
+
+    def test_slots_created_directly_count_against_capacity(self):
+        self.swim(3)
+        with self.assertRaises(CapacityExceeded), transaction.atomic():
+            self.swim(1)
+        self.assertEqual(self.occupied(), 3)
+        self.assertEqual(SwimmingSlot.objects.count(), 1)
+
+    def test_edits_and_deletes_keep_the_counter_in_sync(self):
+        slot = self.swim(2)
+        slot.number_of_people = 1
+        slot.save()
+        self.assertEqual(self.occupied(), 1)
+        slot.book_slot(2)
+        self.assertEqual(self.occupied(), 3)
+        with self.assertRaises(CapacityExceeded):
+            slot.book_slot(1)
+        slot.date = self.day + timedelta(days=1)
+        slot.save()
+        self.assertEqual(self.occupied(), 0)
+        SwimmingSlot.objects.all().delete()
+        self.assertEqual(SwimmingOccupancy.objects.get(session=self.session, date=slot.date).occupied, 0)
+
+    def test_admin_shows_counters_read_only(self):
+        self.swim(2)
+        occupancy = SwimmingOccupancy.objects.get(session=self.session, date=self.day)
+        self.client.force_login(UserModel.objects.create_superuser('01700000099', 'secret'))
+        url = '/admin/Turf/swimmingoccupancy/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(f'{url}add/').status_code, 403)
+        response = self.client.post(f'{url}{occupancy.pk}/change/', {'session': self.session.pk, 'date': self.day, 'occupied': 0})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post(f'{url}{occupancy.pk}/delete/', {'post': 'yes'}).status_code, 403)
+        occupancy.refresh_from_db()
+        self.assertEqual(occupancy.occupied, 2)
+
+    def test_rebuild_recomputes_counters(self):
+        later = self.day + timedelta(days=1)
+        self.swim(2)
+        self.swim(1, date=later)
+        SwimmingOccupancy.objects.update(occupied=0)
+        SwimmingOccupancy.objects.filter(date=later).delete()
+        SwimmingOccupancy.rebuild()
+        self.assertEqual(self.occupied(), 2)
+        self.assertEqual(SwimmingOccupancy.objects.get(session=self.session, date=later).occupied, 1)
+
+
+class BookSlotsTests(SlotTestCase):
+    def setUp(self):
+        self.consumer = TurfSlotConsumer()
+
+    def book_slots(self, mode, *times, sports='Football'):
+        slots = [
+            {'turf_id': self.turf.id, 'field_size_id': self.field_size.id, 'date': self.day.isoformat(),
+             'start_time': start, 'end_time': end}
+            for start, end in times
+        ]
+        return async_to_sync(self.consumer.create_slots)(self.user.id, slots, sports, mode)
+
+    def test_claims_open_slots_and_inserts_the_rest(self):
+        slot = self.open_slot(TurfSlot, '08:00', '09:00', sports='Football')
+        results = self.book_slots('all', ('08:00', '09:00'), ('14:00', '15:00'))
+        self.assertEqual(results[0]['slot_id'], slot.id)
+        self.assertIsNotNone(results[1]['slot_id'])
+        self.assertEqual(TurfSlot.objects.filter(is_available=False, is_booked=True, user=self.user).count(), 2)
+
+    def test_all_mode_books_nothing_when_one_slot_is_taken(self):
+        self.book(TurfSlot, '14:00', '15:00', user=self.other, sports='Football')
+        results = self.book_slots('all', ('08:00', '09:00'), ('14:30', '15:30'))
+        self.assertEqual([result['slot_id'] for result in results], [None, None])
+        self.assertFalse(TurfSlot.objects.filter(user=self.user).exists())
+
+    def test_partial_mode_fails_only_conflicting_slots(self):
+        self.open_slot(TurfSlot, '08:00', '09:00', sports='Football')
+        self.book(TurfSlot, '14:00', '15:00', user=self.other, sports='Football')
+        results = self.book_slots('partial', ('08:00', '09:00'), ('14:30', '15:30'), ('16:00', '17:00'))
+        self.assertEqual([result['slot_id'] is not None for result in results], [True, False, True])
+        self.assertEqual(TurfSlot.objects.filter(user=self.user).count(), 2)
+
+    def test_partial_mode_claims_inventory_generated_after_the_check(self):
+        # The overlap check saw no open slot; the insert then conflicts with one and claims it
+        slot = self.open_slot(TurfSlot, '08:00', '09:00', sports='Football')
+        fields = {'turf_id': self.turf.id, 'field_size_id': self.field_size.id, 'sports': 'Football',
+                  'date': self.day, 'start_time': time(8), 'end_time': time(9)}
+        booked = async_to_sync(self.consumer.insert_slots)(self.user.id, [(TurfSlot, fields, False)], all_or_nothing=False)
+        self.assertEqual(booked[0].id, slot.id)
+
+    def test_batch_slots_are_checked_against_each_other(self):
+        results = self.book_slots('partial', ('10:00', '11:00'), ('10:30', '11:30'), sports='Badminton')
+        self.assertEqual([result['slot_id'] is not None for result in results], [True, False])
+
+
+class BroadcasterTests(SlotTestCase):
+    def test_changes_in_a_window_are_sent_as_one_event(self):
+        broadcaster = AvailabilityBroadcaster(window=60)
+        first = self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        second = self.book(BadmintonSlot, '12:00', '13:00')
+        later = self.day + timedelta(days=1)
+
+        async def receive_events():
+            layer = get_channel_layer()
+            channel = await layer.new_channel()
+            await layer.group_add(availability_group(self.turf.id, self.day), channel)
+            broadcaster.publish(self.turf.id, self.day, slot_delta(first, 'booked'))
+            broadcaster.publish(self.turf.id, self.day, slot_delta(second, 'booked'))
+            broadcaster.publish(self.turf.id, later, slot_delta(first, 'freed'))
+            await broadcaster.aflush()
+            event = await asyncio.wait_for(layer.receive(channel), 1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(layer.receive(channel), 0.05)
+            return event
+
+        event = async_to_sync(receive_events)()
+        self.assertEqual(event['type'], 'availability.delta')
+        self.assertEqual((event['turf_id'], event['date']), (self.turf.id, str(self.day)))
+        self.assertEqual(event['changes'], [
+            {'op': 'booked', 'kind': 'turf', 'slot_id': first.id, 'field_size_id': self.field_size.id,
+             'sports': 'Football', 'start_time': '10:00', 'end_time': '11:00'},
+            {'op': 'booked', 'kind': 'badminton', 'slot_id': second.id, 'field_size_id': self.field_size.id,
+             'sports': None, 'start_time': '12:00', 'end_time': '13:00'},
+        ])
+
+
+class SlotOverlapConstraintTests(SlotTestCase):
+    def test_overlapping_bookings_are_rejected(self):
+        self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.book(TurfSlot, '10:30', '11:30', user=self.other, sports='Football')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.book(BadmintonSlot, '09:00', '12:00')
+            self.book(BadmintonSlot, '10:00', '10:30', user=self.other)
+
+    def test_adjacent_bookings_are_allowed(self):
+        self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        self.book(TurfSlot, '11:00', '12:00', sports='Football')
+        self.assertEqual(TurfSlot.objects.filter(is_available=False).count(), 2)
+
+    def test_other_sport_and_open_slots_do_not_conflict(self):
+        self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        self.book(TurfSlot, '10:00', '11:00', sports='Cricket')
+        self.open_slot(TurfSlot, '10:30', '11:30', sports='Football')
+        self.assertEqual(TurfSlot.objects.count(), 3)
+
+    def test_booking_an_open_slot_that_overlaps_is_rejected(self):
+        self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        slot = self.open_slot(TurfSlot, '10:30', '11:30', sports='Football')
+        slot.is_available = False
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            slot.save()
+
+    def remove_constraints(self):
+        for table, name, _ in SLOT_TABLES:
+            remove_overlap_constraint(connection, table, name)
+            self.assertFalse(has_overlap_constraint(connection, name))
+
+    def test_migration_stops_on_overlapping_bookings(self):
+        migration = importlib.import_module('Turf.migrations.0014_slot_overlap_constraints')
+        self.remove_constraints()
+        self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        self.book(TurfSlot, '10:30', '11:30', user=self.other, sports='Football')
+        with self.assertRaisesMessage(RuntimeError, 'resolve_slot_overlaps --release'):
+            migration.add_overlap_constraints(None, mock.Mock(connection=connection))
+
+    @mock.patch('Turf.constraints._installed', set())
+    def test_bookings_are_checked_without_the_constraint(self):
+        self.remove_constraints()
+        consumer = TurfSlotConsumer()
+        self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        fields = {'user_id': self.other.id, 'turf_id': self.turf.id, 'field_size_id': self.field_size.id,
+                  'sports': 'Football', 'date': self.day, 'start_time': time(10, 30), 'end_time': time(11, 30),
+                  'is_available': False, 'is_booked': True}
+        self.assertIsNone(async_to_sync(consumer.insert_slot)(TurfSlot, **fields))
+        slot = self.open_slot(TurfSlot, '10:30', '11:30', sports='Football')
+        self.assertIsNone(claim_slot(TurfSlot, self.other.id, id=slot.id))
+        self.assertEqual(TurfSlot.objects.filter(is_available=False).count(), 1)
+
+
+class AvailabilityViewTests(SlotTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def grid(self, **params):
+        response = self.client.get(f'/turfs/{self.turf.id}/availability/', {'from': self.day.isoformat(), **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['dates']
+
+    def test_lists_booked_intervals_per_day_and_field_size(self):
+        slot = self.book(TurfSlot, '10:00', '11:00', sports='Football')
+        session = SwimmingSession.objects.create(start_time='06:00', end_time='07:00', capacity=5)
+        dates = self.grid(days=2)
+        later = (self.day + timedelta(days=1)).isoformat()
+        self.assertEqual(list(dates), [self.day.isoformat(), later])
+        self.assertEqual(dates[self.day.isoformat()]['booked'],
+                         {str(self.field_size.id): [['10:00', '11:00', 'Football', slot.id]]})
+        self.assertEqual(dates[later]['booked'], {})
+        self.assertEqual(dates[later]['swimming'], [[session.id, '06:00', '07:00', 5]])
+        self.assertEqual(self.grid(field_size=self.field_size.id + 1)[self.day.isoformat()]['booked'], {})
+
+    def test_bookings_invalidate_the_cached_day(self):
+        self.assertEqual(self.grid()[self.day.isoformat()]['booked'], {})
+        with mock.patch('Turf.signals.broadcaster'):
+            with self.captureOnCommitCallbacks() as callbacks:
+                slot = self.book(BadmintonSlot, '10:00', '11:00')
+                # Served from the cache until the booking commits
+                self.assertEqual(self.grid()[self.day.isoformat()]['booked'], {})
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.grid()[self.day.isoformat()]['booked'],
+                         {str(self.field_size.id): [['10:00', '11:00', 'Badminton', slot.id]]})
+
+    def test_rejects_bad_parameters(self):
+        url = f'/turfs/{self.turf.id}/availability/'
+        self.assertEqual(self.client.get(url, {'days': 0}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'days': 1000}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': 'tomorrow'}).status_code, 400)
+        self.assertEqual(self.client.get(f'/turfs/{self.turf.id + 100}/availability/').status_code, 404)
+
+
+class TurfRatingCounterTests(SlotTestCase):
+    def counters(self, turf=None):
+        turf = turf or self.turf
+        turf.refresh_from_db(fields=['rating', 'rating_sum', 'rating_count'])
+        return turf.rating_sum, turf.rating_count, turf.rating
+
+    def test_counters_follow_creates_edits_and_deletes(self):
+        first = TurfRating.objects.create(user=self.user, turf=self.turf, rating=4)
+        TurfRating.objects.create(user=self.other, turf=self.turf, rating=5)
+        self.assertEqual(self.counters(), (9, 2, 4.5))
+        first.rating = 2
+        first.save()
+        self.assertEqual(self.counters(), (7, 2, 3.5))
+        first.delete()
+        self.assertEqual(self.counters(), (5, 1, 5.0))
+        TurfRating.objects.all().delete()
+        self.assertEqual(self.counters(), (0, 0, 0.0))
+
+    def test_moving_a_rating_updates_both_turfs(self):
+        other_turf = Turf.objects.create(name='Other', location='Dhaka', image='turf_images/other.jpg')
+        rating = TurfRating.objects.create(user=self.user, turf=self.turf, rating=3)
+        rating.turf = other_turf
+        rating.save()
+        self.assertEqual(self.counters(), (0, 0, 0.0))
+        self.assertEqual(self.counters(other_turf), (3, 1, 3.0))
+
+    def test_full_turf_save_keeps_counters(self):
+        turf = Turf.objects.get(pk=self.turf.pk)
+        TurfRating.objects.create(user=self.user, turf=self.turf, rating=4)
+        turf.name = 'Renamed'
+        turf.save()
+        self.assertEqual(self.counters(), (4, 1, 4.0))
+
+
+class TurfListTests(SlotTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.facility = Facility.objects.create(name='Parking')
+        for number in range(4):
+            Turf.objects.create(name=f'Turf {number}', location='Dhaka', image='turf_images/arena.jpg') \
+                .facilities.add(cls.facility)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_follow_the_cursor(self):
+        response = self.client.get('/turfs/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        names = [turf['name'] for turf in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            names += [turf['name'] for turf in page['results']]
+        self.assertEqual(names, ['Arena', 'Turf 0', 'Turf 1', 'Turf 2', 'Turf 3'])
+
+    def test_related_fields_are_prefetched(self):
+        with self.assertNumQueries(4):
+            results = self.client.get('/turfs/').json()['results']
+        self.assertEqual(results[1]['facilities'], [self.facility.id])
+
+    def test_sparse_fieldsets(self):
+        with self.assertNumQueries(1):
+            results = self.client.get('/turfs/', {'fields': 'id,name'}).json()['results']
+        self.assertEqual(results[0], {'id': self.turf.id, 'name': 'Arena'})
+
+
+class ConditionalRequestTests(SlotTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def assertChanged(self, url, response, changed=True):
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200 if changed else 304)
+        return again if changed else response
+
+    def test_list_answers_not_modified_until_the_catalogue_changes(self):
+        cache.set(CATALOGUE_MODIFIED_KEY, (timezone.now() - timedelta(seconds=10)).timestamp(), None)
+        response = self.client.get('/turfs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        response = self.assertChanged('/turfs/', response, changed=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.turf.facilities.add(Facility.objects.create(name='Parking'))
+        self.assertChanged('/turfs/', response)
+
+    def test_detail_version_follows_relations_and_ratings(self):
+        url = f'/turfs/{self.turf.id}/'
+        response = self.client.get(url)
+        response = self.assertChanged(url, response, changed=False)
+        self.turf.sports.add(Sports.objects.create(name='Football'))
+        response = self.assertChanged(url, response)
+        TurfRating.objects.create(user=self.user, turf=self.turf, rating=4)
+        response = self.assertChanged(url, response)
+        self.assertEqual(response.json()['rating'], 4.0)
+        Facility.objects.create(name='Parking').turf_set.add(self.turf)
+        self.assertChanged(url, response)
+
+    def test_last_modified_is_only_sent_once_its_second_has_passed(self):
+        url = f'/turfs/{self.turf.id}/'
+        now = timezone.now()
+        Turf.objects.filter(pk=self.turf.pk).update(updated_at=now)
+        with mock.patch('Turf.caching.time.time', return_value=now.timestamp()):
+            response = self.client.get(url)
+            self.assertNotIn('Last-Modified', response)
+            self.assertIn('ETag', response)
+            # Another change in the same second would carry the same date
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(now.timestamp()))
+            self.assertEqual(response.status_code, 200)
+
+        Turf.objects.filter(pk=self.turf.pk).update(updated_at=timezone.now() - timedelta(seconds=10))
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+
+class SearchTests(SlotTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.football = Sports.objects.create(name='Football')
+        cls.green = Turf.objects.create(name='Green Field', location='Arena Road', image='turf_images/green.jpg')
+        cls.green.sports.add(cls.football)
+        Turf.objects.create(name='Blue Court', location='Chittagong', image='turf_images/blue.jpg')
+
+    def search(self, **params):
+        response = self.client.get('/turfs/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [turf['name'] for turf in response.json()['results']]
+
+    def test_prefix_matches_come_first(self):
+        self.assertEqual(self.search(q='arena'), ['Arena', 'Green Field'])
+        self.assertEqual(self.search(q='field'), ['Green Field'])
+        self.assertEqual(self.search(q='nowhere'), [])
+
+    def test_filters(self):
+        self.assertEqual(self.search(q='arena', sports=str(self.football.id)), ['Green Field'])
+        self.assertEqual(self.client.get('/turfs/search/', {'min_rating': 'high'}).status_code, 400)
+        self.assertEqual(self.client.get('/turfs/', {'sports': 'x'}).status_code, 400)
+
+
+class NearbyTests(SlotTestCase):
+    def test_covering_cells_wrap_around_the_antimeridian(self):
+        box = geo.bounding_box(0.0, 179.99, 5)
+        self.assertGreater(box[3], 180)
+        cells = geo.covering_cells(*box)
+        for longitude in (179.99, -179.99):
+            self.assertTrue(any(geo.encode(0.0, longitude).startswith(cell) for cell in cells))
+
+    def test_nearest_first_across_the_antimeridian(self):
+        east = Turf.objects.create(name='East', location='Fiji', image='turf_images/east.jpg',
+                                   latitude=0.0, longitude=179.99)
+        west = Turf.objects.create(name='West', location='Samoa', image='turf_images/west.jpg',
+                                   latitude=0.0, longitude=-179.98)
+        Turf.objects.create(name='Far', location='Tonga', image='turf_images/far.jpg', latitude=0.0, longitude=179.5)
+        response = self.client.get('/turfs/nearby/', {'lat': 0.0, 'lng': 179.995, 'radius': 5})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([turf['id'] for turf in results], [east.id, west.id])
+        self.assertLess(results[0]['distance_km'], results[1]['distance_km'])
+
+    def test_rejects_bad_coordinates(self):
+        self.assertEqual(self.client.get('/turfs/nearby/', {'lat': 91, 'lng': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/turfs/nearby/', {'lat': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/turfs/nearby/', {'lat': 0, 'lng': 0, 'radius': 1000}).status_code, 400)
+
+
+def jpeg_bytes(size=(800, 600), color='green'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@contextmanager
+def unreachable_broker():
+    """
+    Publish tasks to a closed local port through a fresh producer pool.
+    """
+    def connection_for_write(url=None, **kwargs):
+        return Celery.connection_for_write(celery_app, 'redis://127.0.0.1:1/0', **kwargs)
+
+    with mock.patch.object(celery_app, 'connection_for_write', connection_for_write), \
+            mock.patch.object(celery_app.amqp, '_producer_pool', None):
+        yield
+
+
+class CountingStorage(InMemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.saved = []
+
+    def save(self, name, content, max_length=None):
+        self.saved.append(name)
+        return super().save(name, content, max_length)
+
+
+@override_settings(STORAGES={'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+class ImageVariantTests(SlotTestCase):
+    def test_builds_every_size_and_format(self):
+        storage = CountingStorage()
+        file = io.BytesIO(jpeg_bytes())
+        paths = build_variants(file, content_hash(file), storage=storage)
+        self.assertEqual(set(paths), set(settings.TURF_IMAGE_VARIANTS))
+        self.assertEqual(len(storage.saved), len(settings.TURF_IMAGE_VARIANTS) * 2)
+        with storage.open(paths['thumb']['webp']) as variant, Image.open(variant) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', settings.TURF_IMAGE_VARIANTS['thumb']))
+
+    def test_same_content_reuses_existing_variants(self):
+        storage = CountingStorage()
+        first, second = io.BytesIO(jpeg_bytes()), io.BytesIO(jpeg_bytes())
+        self.assertEqual(content_hash(first), content_hash(second))
+        paths = build_variants(first, content_hash(first), storage=storage)
+        saved = len(storage.saved)
+        self.assertEqual(build_variants(second, content_hash(second), storage=storage), paths)
+        self.assertEqual(len(storage.saved), saved)
+        self.assertNotEqual(content_hash(io.BytesIO(jpeg_bytes(color='blue'))), content_hash(first))
+
+    def test_task_records_variants_and_a_new_image_resets_them(self):
+        turf = Turf.objects.create(name='Pitch', location='Dhaka', image=ContentFile(jpeg_bytes(), 'pitch.jpg'))
+        process_turf_image(turf.id)
+        turf.refresh_from_db()
+        self.assertEqual(len(turf.image_hash), 64)
+        self.assertEqual(set(turf.image_variants), set(settings.TURF_IMAGE_VARIANTS))
+        turf.image = ContentFile(jpeg_bytes(color='blue'), 'pitch2.jpg')
+        turf.save()
+        turf.refresh_from_db()
+        self.assertEqual((turf.image_hash, turf.image_variants), ('', {}))
+
+    def test_unreachable_broker_does_not_block_the_request(self):
+        with unreachable_broker(), self.assertLogs('Turf.signals', 'ERROR'):
+            started = clock.monotonic()
+            enqueue_image_processing(self.turf.id)
+        self.assertLess(clock.monotonic() - started, 2)
+
+
+class SocketTestCase(SlotTestCase):
+    def communicator(self, msgpack_protocol=False):
+        communicator = WebsocketCommunicator(
+            TurfSlotConsumer.as_asgi(), '/ws/turf/', subprotocols=['msgpack'] if msgpack_protocol else [],
+        )
+        communicator.scope['user'] = self.user
+        return communicator
+
+    def exchange(self, messages, replies, msgpack_protocol=False):
+        """
+        Send messages over a new socket and return the first `replies` messages it answers with.
+        """
+        async def run():
+            communicator = self.communicator(msgpack_protocol)
+            connected, subprotocol = await communicator.connect()
+            self.assertTrue(connected)
+            self.assertEqual(subprotocol, 'msgpack' if msgpack_protocol else None)
+            for message in messages:
+                if msgpack_protocol:
+                    await communicator.send_to(bytes_data=msgpack.packb(message))
+                elif isinstance(message, str):
+                    await communicator.send_to(text_data=message)
+                else:
+                    await communicator.send_json_to(message)
+            received = []
+            for _ in range(replies):
+                if msgpack_protocol:
+                    received.append(msgpack.unpackb(await communicator.receive_from()))
+                else:
+                    received.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return received
+
+        return async_to_sync(run)()
+
+
+class SocketProtocolTests(SocketTestCase):
+    def test_schema_rejects_bad_messages(self):
+        slot = {'turf_id': 1, 'field_size_id': '2', 'date': '2030-01-01', 'start_time': '10:00', 'end_time': '11:00'}
+        self.assertIsNone(validate_message({'type': 'book_slot', 'sports': 'Football', **slot}))
+        self.assertIsNone(validate_message({'type': 'book_slots', 'sports': 'Cricket', 'slots': [slot]}))
+        for message in (
+            {},
+            {'type': 'drop_tables'},
+            {'type': 'book_slot', 'sports': 'Chess', **slot},
+            {'type': 'book_slot', 'sports': 'Football', **slot, 'date': '1st January'},
+            {'type': 'book_slot', 'sports': 'Swimming', 'turf_id': 1, 'field_size_id': 1, 'date': '2030-01-01'},
+            {'type': 'book_slots', 'slots': []},
+            {'type': 'book_slots', 'slots': [slot] * (BOOK_SLOTS_MAX + 1)},
+            {'type': 'claim_slot', 'sports': 'Football', 'slot_id': -1},
+        ):
+            self.assertIsNotNone(validate_message(message), message)
+
+    def test_invalid_messages_are_answered_with_an_error(self):
+        replies = self.exchange(['{not json', {'type': 'subscribe', 'turf_id': self.turf.id}], 2)
+        self.assertEqual(replies[0]['message'], 'Error: Malformed message.')
+        self.assertTrue(replies[1]['message'].startswith('Error: Invalid message:'))
+
+    def test_msgpack_sub_protocol(self):
+        replies = self.exchange([
+            {'type': 'subscribe', 'turf_id': self.turf.id, 'date': self.day.isoformat()},
+            {'type': 'get_available_sessions', 'sports': 'Swimming', 'date': self.day.isoformat()},
+        ], 2, msgpack_protocol=True)
+        self.assertEqual(replies, [
+            {'type': 'subscribed', 'turf_id': self.turf.id, 'date': self.day.isoformat()},
+            {'type': 'available_sessions', 'sessions': []},
+        ])
+
+
+class SocketThrottleTests(SocketTestCase):
+    def test_token_bucket_allows_bursts_then_the_rate(self):
+        with mock.patch('Turf.throttle.time.monotonic', return_value=100.0) as monotonic:
+            bucket = TokenBucket(rate=2, capacity=3)
+            self.assertEqual([bucket.take() for _ in range(4)], [True, True, True, False])
+            monotonic.return_value = 100.5
+            self.assertEqual([bucket.take() for _ in range(2)], [True, False])
+            monotonic.return_value = 200.0
+            self.assertEqual([bucket.take() for _ in range(4)], [True, True, True, False])
+        self.assertIsNone(TokenBucket.from_setting(None))
+
+    def test_sockets_of_a_user_share_one_bucket(self):
+        bucket = user_bucket(self.user.id, (1, 1))
+        self.assertIs(user_bucket(self.user.id, (1, 1)), bucket)
+        self.assertIsNot(user_bucket(self.other.id, (1, 1)), bucket)
+        self.assertIsNone(user_bucket(self.user.id, None))
+
+    @override_settings(SOCKET_RATE_LIMIT=(0.001, 2), SOCKET_USER_RATE_LIMIT=None)
+    def test_messages_over_the_rate_are_rejected(self):
+        message = {'type': 'subscribe', 'turf_id': self.turf.id, 'date': self.day.isoformat()}
+        replies = self.exchange([message] * 3, 3)
+        self.assertEqual(sorted(reply.get('type', 'error') for reply in replies), ['error', 'subscribed', 'subscribed'])
+        self.assertTrue(any(reply.get('message', '').startswith('Error: Too many messages on this connection')
+                            for reply in replies))
+
+    def test_full_queue_rejects_new_messages(self):
+        consumer = TurfSlotConsumer()
+        consumer.use_msgpack = False
+        consumer.connection_bucket = consumer.user_bucket = None
+        consumer.send = mock.AsyncMock()
+
+        async def receive_twice():
+            consumer.in_flight = asyncio.Queue(maxsize=1)
+            message = json.dumps({'type': 'subscribe', 'turf_id': self.turf.id, 'date': self.day.isoformat()})
+            await consumer.receive(text_data=message)
+            await consumer.receive(text_data=message)
+            return consumer.in_flight.qsize()
+
+        self.assertEqual(async_to_sync(receive_twice)(), 1)
+        consumer.send.assert_called_once()
+        self.assertTrue(json.loads(consumer.send.call_args.kwargs['text_data'])['message'].startswith(
+            'Error: Too many requests in progress'))
+
+
+class MetricsTests(SlotTestCase):
+    def sample(self, name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_metrics_are_limited_to_allowed_addresses_and_staff(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 403)
+        staff = UserModel.objects.create_user('01700000003')
+        staff.is_staff = staff.is_active = True
+        staff.save()
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+    async def test_requests_are_recorded_under_asgi(self):
+        labels = {'view': 'turfs-list', 'method': 'GET', 'status': '200'}
+        before = self.sample('http_request_seconds_count', labels)
+        response = await self.async_client.get('/turfs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sample('http_request_seconds_count', labels), before + 1)
+
+
+@override_settings(SQL_PROFILING=True)
+class SqlProfilingTests(SocketTestCase):
+    def test_rest_responses_carry_server_timing(self):
+        response = self.client.get(f'/turfs/{self.turf.id}/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[0-9.]+;desc="[1-9][0-9]* queries", total;dur=[0-9.]+$')
+        with self.settings(SQL_PROFILING=False):
+            self.assertNotIn('Server-Timing', self.client.get(f'/turfs/{self.turf.id}/'))
+
+    def test_socket_replies_are_followed_by_a_profile(self):
+        replies = self.exchange([{'type': 'get_available_sessions', 'sports': 'Swimming', 'date': self.day.isoformat()}], 2)
+        self.assertEqual(replies[0]['type'], 'available_sessions')
+        profile = replies[1]
+        self.assertEqual((profile['type'], profile['message_type']), ('profile', 'get_available_sessions'))
+        self.assertEqual(profile['queries'], 1)
+        self.assertEqual(len(profile['slowest']), 1)
+        self.assertIn('Turf_swimmingsession', profile['slowest'][0]['sql'])
+
+
+class ClaimSlotTests(SlotTestCase):
+    def test_claims_an_open_slot_once(self):
+        slot = self.open_slot(TurfSlot, '10:00', '11:00', sports='Football')
+        claimed = claim_slot(TurfSlot, self.user.id, 'Football', id=slot.id)
+        self.assertEqual(claimed.id, slot.id)
+        slot.refresh_from_db()
+        self.assertEqual((slot.user_id, slot.is_available, slot.is_booked), (self.user.id, False, True))
+        self.assertIsNone(claim_slot(TurfSlot, self.other.id, 'Football', id=slot.id))
+
+    def test_matches_by_time_range_and_sport(self):
+        self.open_slot(TurfSlot, '10:00', '11:00', sports='Football')
+        lookup = dict(turf_id=self.turf.id, field_size_id=self.field_size.id, date=self.day,
+                      start_time=time(10), end_time=time(11))
+        self.assertIsNone(claim_slot(TurfSlot, self.user.id, 'Cricket', **lookup))
+        self.assertIsNotNone(claim_slot(TurfSlot, self.user.id, 'Football', **lookup))
+
+    def test_refuses_past_slots(self):
+        slot = TurfSlot.objects.create(
+            turf=self.turf, field_size=self.field_size, date=date.today() - timedelta(days=1),
+            start_time='10:00', end_time='11:00', sports='Football',
+        )
+        self.assertIsNone(claim_slot(TurfSlot, self.user.id, 'Football', id=slot.id))
+
+    def test_refuses_a_slot_overlapping_a_booking(self):
+        self.book(BadmintonSlot, '10:30', '11:30')
+        slot = self.open_slot(BadmintonSlot, '10:00', '11:00')
+        self.assertIsNone(claim_slot(BadmintonSlot, self.other.id, id=slot.id))
+        slot.refresh_from_db()
+        self.assertTrue(slot.is_available)
+
+    def test_inventory_keeps_one_slot_per_sport(self):
+        for sports in ('Football', 'Cricket'):
+            OpeningHours.objects.create(turf=self.turf, field_size=self.field_size, sports=sports,
+                                        weekday=self.day.weekday(), open_time='10:00', close_time='12:00')
+        generate_inventory(days=1, start=self.day)
+        generate_inventory(days=1, start=self.day)
+        self.assertEqual(sorted(TurfSlot.objects.values_list('sports', 'start_time')), [
+            ('Cricket', time(10)), ('Cricket', time(11)), ('Football', time(10)), ('Football', time(11)),
+        ])
@@ -0,0 +1,51 @@
+import threading
+import time
+import weakref
+
+
+class TokenBucket:
+    """
+    Allows `rate` events per second on average and bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_setting(cls, limit):
+        """
+        Bucket for a (rate, burst) setting, or None when the setting disables the limit.
+        """
+        return cls(*limit) if limit else None
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+_user_buckets = weakref.WeakValueDictionary()
+_user_buckets_lock = threading.Lock()
+
+
+def user_bucket(user_id, limit):
+    """
+    The bucket shared by every socket of a user in this process; it is dropped
+    once the last of them closes.
+    """
+    if not limit:
+        return None
+    with _user_buckets_lock:
+        bucket = _user_buckets.get(user_id)
+        if bucket is None:
+            bucket = _user_buckets[user_id] = TokenBucket(*limit)
+        return bucket
@@ -1,9 +1,164 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from .models import Turf
-from .serializers import TurfSerializer
+from .serializers import TurfSerializer, requested_fields
+from .pagination import TurfCursorPagination
+from .caching import catalogue_modified, last_modified_second, representation_key
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .availability import availability_grid
+from .search import filter_turfs, search_turfs, nearby_turfs
 from rest_framework.response import Response
 from datetime import timedelta,datetime
+from django.conf import settings
+from django.utils import timezone
 
 class TurfViewSet(viewsets.ModelViewSet):
     queryset = Turf.objects.all()
     serializer_class = TurfSerializer
+    pagination_class = TurfCursorPagination
+    related_fields = ['facilities', 'availble_offers', 'sports']
+
+    def get_queryset(self):
+        """
+        Prefetch the many-to-many fields the response will contain, so a page of
+        turfs costs a fixed number of queries.
+        """
+        fields = requested_fields(self.request)
+        prefetch = [name for name in self.related_fields if fields is None or name in fields]
+        return super().get_queryset().prefetch_related(*prefetch)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in ('list', 'search', 'nearby'):
+            queryset = filter_turfs(queryset, self.request.query_params)
+        return queryset
+
+    @action(detail=False, methods=['GET'])
+    def search(self, request):
+        """
+        Turfs matching ?q= (prefix or fuzzy match on name/location), best matches
+        first, combined with the ?sports=, ?facilities= and ?min_rating= filters.
+        Returns up to ?limit= (default 20, at most 100) results.
+        """
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response({'message': 'Invalid "sports", "facilities", "min_rating" or "limit".'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = search_turfs(queryset, request.query_params.get('q', ''))
+        serializer = self.get_serializer(queryset[:max(limit, 1)], many=True)
+        return Response({'results': serializer.data}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['GET'])
+    def nearby(self, request):
+        """
+        Up to ?limit= (default 20, at most 100) turfs within ?radius= km (default
+        NEARBY_DEFAULT_RADIUS_KM) of ?lat=&lng=, nearest first, each with its
+        distance_km. Accepts the same filters as the list.
+        """
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+            latitude = float(request.query_params['lat'])
+            longitude = float(request.query_params['lng'])
+            radius = float(request.query_params.get('radius', settings.NEARBY_DEFAULT_RADIUS_KM))
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except (KeyError, ValueError):
+            return Response({'message': 'Invalid or missing "lat", "lng", "radius", "limit" or filters.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return Response({'message': '"lat" or "lng" is out of range.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < radius <= settings.NEARBY_MAX_RADIUS_KM:
+            return Response(
+                {'message': f'"radius" must be greater than 0 and at most {settings.NEARBY_MAX_RADIUS_KM} km.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        nearest = nearby_turfs(queryset, latitude, longitude, radius, max(limit, 1))
+        serializer = self.get_serializer([turf for turf, _ in nearest], many=True)
+        results = [
+            {**data, 'distance_km': round(distance, 3)}
+            for data, (_, distance) in zip(serializer.data, nearest)
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def with_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """
+        Answers 304 when the catalogue has not changed since the client's copy, and
+        otherwise serves the page from a cache keyed by the query parameters.
+        """
+        try:
+            filter_turfs(Turf.objects.none(), request.query_params)
+        except ValueError:
+            return Response({'message': 'Invalid "sports", "facilities" or "min_rating".'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        modified = catalogue_modified()
+        key = representation_key(request, 'turf-list', modified)
+        etag = f'"{key}"'
+        last_modified = last_modified_second(modified)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = f"turf-list:{key}"
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, settings.TURF_LIST_CACHE_TIMEOUT)
+        return self.with_validators(Response(data), etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Checks If-None-Match / If-Modified-Since against the turf's version before
+        loading and serializing it.
+        """
+        state = Turf.objects.filter(pk=kwargs.get('pk')).values_list('version', 'updated_at').first()
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+        version, updated_at = state
+        etag = f'"{representation_key(request, "turf", kwargs.get("pk"), version, updated_at.isoformat())}"'
+        last_modified = last_modified_second(updated_at.timestamp())
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self.with_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
+
+    @action(detail=True, methods=['GET'])
+    def availability(self, request, pk=None):
+        """
+        Booked intervals per field size and swimming capacity for ?from=YYYY-MM-DD
+        (default today) and the following ?days= days, optionally for one ?field_size=.
+        """
+        turf_id = self.get_queryset().filter(pk=pk).values_list('pk', flat=True).first()
+        if turf_id is None:
+            return Response({'message': 'Turf not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            start_date = datetime.strptime(request.query_params['from'], "%Y-%m-%d").date() \
+                if 'from' in request.query_params else timezone.localdate()
+            days = int(request.query_params.get('days', 1))
+            field_size_id = request.query_params.get('field_size')
+            field_size_id = int(field_size_id) if field_size_id else None
+        except ValueError:
+            return Response({'message': 'Invalid "from", "days" or "field_size".'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= settings.AVAILABILITY_MAX_DAYS:
+            return Response(
+                {'message': f'"days" must be between 1 and {settings.AVAILABILITY_MAX_DAYS}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response({
+            'turf_id': turf_id,
+            'from': start_date.isoformat(),
+            'days': days,
+            'dates': availability_grid(turf_id, start_date, days, field_size_id),
+        }, status=status.HTTP_200_OK)
@@ -10,13 +10,18 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Turf_management.settings')
 # Get the ASGI application
 application = get_asgi_application()
 
+from User.authentication import TokenAuthMiddleware  # needs the app registry loaded above
+
 # Set up the ASGI application to handle WebSocket connections
 application = ProtocolTypeRouter({
     "http": application,  # HTTP requests are handled by the default ASGI application
     "websocket": AllowedHostsOriginValidator(
         AuthMiddlewareStack(
-            URLRouter(
-                websocket_urlpatterns  # URL patterns for WebSocket connections
+            # Token (?token= or Authorization header) takes precedence over the session user
+            TokenAuthMiddleware(
+                URLRouter(
+                    websocket_urlpatterns  # URL patterns for WebSocket connections
+                )
             )
         )
     ),
@@ -0,0 +1,203 @@
+"""
+Prometheus metrics for the booking socket, the REST API and OTP delivery, plus
+the per-request/per-message query recorder they share. With SQL_PROFILING on,
+the recorder also keeps the slowest statements, reports them in Server-Timing
+headers / socket debug messages and logs work over the SQL budget.
+
+With several server processes, point PROMETHEUS_MULTIPROC_DIR at a shared empty
+directory so /metrics aggregates all of them. /metrics answers only addresses in
+METRICS_ALLOWED_IPS and staff users.
+"""
+import contextvars
+import heapq
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess,
+)
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+SOCKET_MESSAGE_SECONDS = Histogram(
+    'turf_socket_message_seconds', 'Time to handle a TurfSlotConsumer message', ['type'],
+)
+SOCKET_MESSAGE_QUERIES = Histogram(
+    'turf_socket_message_db_queries', 'DB queries per TurfSlotConsumer message', ['type'], buckets=QUERY_BUCKETS,
+)
+SOCKET_MESSAGE_DB_SECONDS = Histogram(
+    'turf_socket_message_db_seconds', 'DB time per TurfSlotConsumer message', ['type'],
+)
+BOOKING_OUTCOMES = Counter(
+    'turf_booking_outcomes_total', 'Booking requests by sport and outcome', ['sport', 'outcome'],
+)
+SOCKET_THROTTLED = Counter(
+    'turf_socket_throttled_total', 'Socket messages rejected by rate limits or a full queue', ['reason'],
+)
+ACTIVE_SOCKETS = Gauge(
+    'turf_active_sockets', 'Open TurfSlotConsumer connections', multiprocess_mode='livesum',
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_seconds', 'REST request latency by view', ['view', 'method', 'status'],
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'DB queries per REST request by view', ['view'], buckets=QUERY_BUCKETS,
+)
+OTP_SMS = Counter(
+    'otp_sms_total', 'OTP SMS delivery attempts by result', ['result'],
+)
+
+
+class QueryStats:
+    """
+    Query count and DB time of one request or socket message; updated from
+    whichever DB thread runs the queries. With keep > 0 it also remembers the
+    `keep` slowest statements.
+    """
+
+    def __init__(self, keep=0):
+        self.count = 0
+        self.seconds = 0.0
+        self.keep = keep
+        self._slowest = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_settings(cls):
+        return cls(keep=settings.SQL_PROFILING_SLOWEST if settings.SQL_PROFILING else 0)
+
+    def add(self, sql, seconds):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            if self.keep:
+                entry = (seconds, sql)
+                if len(self._slowest) < self.keep:
+                    heapq.heappush(self._slowest, entry)
+                elif entry > self._slowest[0]:
+                    heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self):
+        """
+        [(milliseconds, sql), ...], slowest first.
+        """
+        return [(round(seconds * 1000, 2), sql) for seconds, sql in sorted(self._slowest, reverse=True)]
+
+    def summary(self, elapsed):
+        return {
+            'queries': self.count,
+            'db_ms': round(self.seconds * 1000, 2),
+            'total_ms': round(elapsed * 1000, 2),
+            'slowest': [{'ms': ms, 'sql': sql} for ms, sql in self.slowest()],
+        }
+
+    def server_timing(self, elapsed):
+        return f'db;dur={self.seconds * 1000:.2f};desc="{self.count} queries", total;dur={elapsed * 1000:.2f}'
+
+    def check_budget(self, label, elapsed):
+        """
+        Log `label` when it ran more than SQL_BUDGET_QUERIES queries or spent more than SQL_BUDGET_MS in the DB.
+        """
+        if self.count <= settings.SQL_BUDGET_QUERIES and self.seconds * 1000 <= settings.SQL_BUDGET_MS:
+            return
+        slowest = "; ".join(f"{ms} ms: {sql[:200]}" for ms, sql in self.slowest())
+        logger.warning(
+            f"{label} over SQL budget: {self.count} queries, {self.seconds * 1000:.1f} ms DB, "
+            f"{elapsed * 1000:.1f} ms total. Slowest: {slowest}"
+        )
+
+
+current_query_stats = contextvars.ContextVar('current_query_stats', default=None)
+
+
+@contextmanager
+def recording_queries(stats=None):
+    """
+    Attribute queries run in this context, including sync_to_async DB threads
+    (they copy the context), to a QueryStats.
+    """
+    stats = stats if stats is not None else QueryStats.for_settings()
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver: add the recorder to every new DB connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    """
+    Latency and query count per resolved view; with SQL_PROFILING also a
+    Server-Timing header and budget logging. Runs natively under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with recording_queries() as stats:
+            response = self.get_response(request)
+        return self.observe(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with recording_queries() as stats:
+            response = await self.get_response(request)
+        return self.observe(request, response, stats, time.perf_counter() - started)
+
+    @staticmethod
+    def observe(request, response, stats, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.view_name else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(view, request.method, response.status_code).observe(elapsed)
+        HTTP_REQUEST_QUERIES.labels(view).observe(stats.count)
+        if settings.SQL_PROFILING:
+            response['Server-Timing'] = stats.server_timing(elapsed)
+            stats.check_budget(f"{request.method} {request.get_full_path()}", elapsed)
+        return response
+
+
+def metrics_view(request):
+    user = getattr(request, 'user', None)
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS and not (user and user.is_staff):
+        return HttpResponseForbidden()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -13,6 +13,11 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from pathlib import Path
 
 MAX_OTP_TRY = 3
+# OTP state lives in the cache (User.otp): code lifetime, window in which at most
+# MAX_OTP_TRY codes can be requested, and wrong guesses allowed per code
+OTP_TTL = 600
+OTP_LOCKOUT = 3600
+OTP_MAX_VERIFY_ATTEMPTS = 5
 AUTH_USER_MODEL = "User.UserModel"
 MIN_PASSWORD_LENGTH = 8
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -59,6 +64,7 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_ALL_ORIGINS = True
 
 MIDDLEWARE = [
+    'Turf_management.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,10 +98,15 @@ ASGI_APPLICATION = 'Turf_management.asgi.application'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'User.authentication.CachedTokenAuthentication',
     ],
    
 }
+# Seconds a resolved auth token -> user is cached (dropped early on logout or user changes)
+TOKEN_CACHE_TIMEOUT = 300
+# /turfs/nearby/: search radius in km when none is given, and the largest one accepted
+NEARBY_DEFAULT_RADIUS_KM = 5
+NEARBY_MAX_RADIUS_KM = 50
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
@@ -113,6 +124,20 @@ CHANNEL_LAYERS = {
         },
     },
 }
+# TurfSlotConsumer flood protection: (messages per second, burst) per socket and per
+# user (None disables), and how many accepted messages may wait to be processed per socket
+SOCKET_RATE_LIMIT = (5, 20)
+SOCKET_USER_RATE_LIMIT = (10, 40)
+SOCKET_MAX_IN_FLIGHT = 8
+# Availability changes per turf/date are coalesced into one broadcast per window (seconds)
+AVAILABILITY_BROADCAST_WINDOW = 0.25
+# Seconds a per-process slot overlap bitmap stays warm before reloading from the DB
+SLOT_INDEX_TTL = 30
+# Extra attempts for booking writes that fail on deadlocks/serialization errors
+BOOKING_WRITE_RETRIES = 3
+# Days of open slots `manage.py generate_slots` materialises from opening hours, and rows per INSERT
+SLOT_INVENTORY_DAYS = 14
+SLOT_INVENTORY_BATCH_SIZE = 1000
 
 import environ
 env = environ.Env()
@@ -120,6 +145,40 @@ environ.Env.read_env()
 
 SECRET_KEY = env("SECRET_KEY")
 SMS_API_KEY = env("SMS_API_KEY")
+# SMS delivery (User.sms): gateway class, (connect, read) timeouts in seconds,
+# pooled connections per worker, and the circuit breaker's failure threshold / cool-down
+SMS_GATEWAY = env("SMS_GATEWAY", default="User.sms.BulkSmsGateway")
+SMS_TIMEOUT = (3, 10)
+SMS_POOL_SIZE = 10
+SMS_CIRCUIT_FAILURES = 5
+SMS_CIRCUIT_RESET = 60
+
+# Shared cache (e.g. redis://host:6379/1) so invalidation reaches every process
+CACHES = {
+    'default': env.cache_url("CACHE_URL", default="locmemcache://"),
+}
+# Availability grid endpoint: longest range per request and cache lifetime per turf/date
+AVAILABILITY_MAX_DAYS = 14
+AVAILABILITY_CACHE_TIMEOUT = 300
+# Cached /turfs/ pages are also dropped whenever any turf changes
+TURF_LIST_CACHE_TIMEOUT = 600
+
+# Opt-in SQL profiling: Server-Timing headers, socket "profile" messages and a warning
+# log for requests/messages over the query or DB-time budget
+SQL_PROFILING = env.bool("SQL_PROFILING", default=False)
+SQL_PROFILING_SLOWEST = 5
+SQL_BUDGET_QUERIES = 20
+SQL_BUDGET_MS = 200
+# Addresses allowed to scrape /metrics without a staff login (e.g. the Prometheus server)
+METRICS_ALLOWED_IPS = env.list("METRICS_ALLOWED_IPS", default=["127.0.0.1", "::1"])
+
+# Background jobs (turf image variants, OTP SMS); CELERY_TASK_ALWAYS_EAGER=True runs them inline
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://localhost:6379/0")
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", default=False)
+CELERY_TASK_ACKS_LATE = True
+# Tasks are queued from requests: with the broker down, fail after one connection
+# attempt (kombu retries for ~6s by default) and callers log the job as not queued
+CELERY_BROKER_TRANSPORT_OPTIONS = {'max_retries': 0, 'socket_connect_timeout': 1}
 
 import dj_database_url
 DATABASES = {
@@ -172,3 +231,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 import os
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media') 
 MEDIA_URL = '/media/'
+# Fixed (width, height) renditions generated for every turf image, as WebP and JPEG
+TURF_IMAGE_VARIANTS = {
+    'thumb': (320, 180),
+    'card': (640, 360),
+    'large': (1280, 720),
+}
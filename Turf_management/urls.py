@@ -23,6 +23,7 @@ from User.views import UserViewset,UserProfileUpdateViewset
 from rest_framework.authtoken.views import obtain_auth_token
 from Turf.views import TurfViewSet
 from Offers.views import CuoponView
+from .metrics import metrics_view
 router = DefaultRouter()
 router.register(r"user",UserViewset,basename="user")
 router.register(r"update",UserProfileUpdateViewset,basename="update")
@@ -32,6 +33,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path("api-auth/",include("rest_framework.urls")),
     path('api-token-auth/', obtain_auth_token, name='api_token_auth'),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 urlpatterns += router.urls
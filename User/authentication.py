@@ -0,0 +1,85 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+# The only user columns kept in the cache; the password hash and profile never leave the database
+CACHED_USER_FIELDS = ('id', 'phone_number', 'is_active', 'is_staff', 'is_superuser')
+
+
+def token_cache_key(key):
+    return f"auth-token:v2:{key}"
+
+
+def get_token_user(key):
+    """
+    The active user owning an auth token, or None. The token resolves to
+    CACHED_USER_FIELDS, cached for TOKEN_CACHE_TIMEOUT seconds; User.signals drops
+    the entry when the token is deleted (logout) or the user is saved (e.g.
+    deactivated). Other fields are deferred and loaded on first access.
+    """
+    cache_key = token_cache_key(key)
+    values = cache.get(cache_key)
+    if values is None:
+        values = Token.objects.filter(key=key).values(*(f'user__{name}' for name in CACHED_USER_FIELDS)).first()
+        if values is None:
+            return None
+        values = {name: values[f'user__{name}'] for name in CACHED_USER_FIELDS}
+        if not values['is_active']:
+            # Not cached: verify_otp activates accounts with a plain UPDATE, which sends no signal
+            return None
+        cache.set(cache_key, values, settings.TOKEN_CACHE_TIMEOUT)
+    model = get_user_model()
+    # from_db expects the values in concrete field order; the other fields are deferred
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication without a token/user query on every request. The token
+    is only read from the Authorization header, never from the query string.
+    """
+
+    def authenticate_credentials(self, key):
+        user = get_token_user(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return (user, key)
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates WebSocket connections with the same tokens as the REST API, passed
+    as an "Authorization: Token <key>" header or, for WebSocket handshakes only
+    (browsers cannot set headers on them), as ?token=<key>. Without a token the
+    scope user is left as is.
+    """
+
+    async def __call__(self, scope, receive, send):
+        key = self.token_from_scope(scope)
+        if key:
+            scope = dict(scope, user=await database_sync_to_async(get_token_user)(key) or AnonymousUser())
+        return await super().__call__(scope, receive, send)
+
+    @staticmethod
+    def token_from_scope(scope):
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                keyword, _, key = value.decode('latin1').partition(' ')
+                if keyword == 'Token' and key:
+                    return key.strip()
+        if scope.get('type') != 'websocket':
+            return None
+        values = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        return values[0] if values else None
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='usermodel',
+            name='max_otp_try',
+        ),
+        migrations.RemoveField(
+            model_name='usermodel',
+            name='otp',
+        ),
+        migrations.RemoveField(
+            model_name='usermodel',
+            name='otp_expiry',
+        ),
+        migrations.RemoveField(
+            model_name='usermodel',
+            name='otp_max_out',
+        ),
+    ]
@@ -1,5 +1,4 @@
 from django.db import models
-from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser,BaseUserManager,PermissionsMixin
 from django.core.validators import RegexValidator,validate_email
 # Create your models here.
@@ -40,10 +39,6 @@ class UserModel(AbstractBaseUser,PermissionsMixin):
     birthdate = models.DateField(null=True, blank=True)  
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, null=True, blank=True)
     address = models.TextField(null=True, blank=True)  
-    otp = models.CharField(max_length=4)
-    otp_expiry = models.DateTimeField(null=True, blank=True)
-    max_otp_try = models.CharField(max_length=2,default=settings.MAX_OTP_TRY)
-    otp_max_out = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     user_registered_at = models.DateTimeField(auto_now_add=True)
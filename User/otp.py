@@ -0,0 +1,70 @@
+"""
+OTP codes, send counters and verification attempts, kept in the cache with
+TTLs instead of on the user row. Counters use cache.add + cache.incr, which are
+atomic on Redis and Memcached.
+"""
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class OtpLocked(Exception):
+    """
+    MAX_OTP_TRY codes were sent within OTP_LOCKOUT seconds.
+    """
+
+
+def _code_key(user_id):
+    return f"otp:code:{user_id}"
+
+
+def _sends_key(user_id):
+    return f"otp:sends:{user_id}"
+
+
+def _attempts_key(user_id):
+    return f"otp:attempts:{user_id}"
+
+
+def _increment(key, timeout):
+    """
+    Atomically add one to a counter that expires `timeout` seconds after it was created.
+    """
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, timeout)
+        return 1
+
+
+def generate_otp(user_id):
+    """
+    Issue a new 4-digit code valid for OTP_TTL seconds, replacing any previous one.
+    Raises OtpLocked once MAX_OTP_TRY codes were issued in the current OTP_LOCKOUT window.
+    """
+    if _increment(_sends_key(user_id), settings.OTP_LOCKOUT) > settings.MAX_OTP_TRY:
+        raise OtpLocked
+    code = f"{secrets.randbelow(9000) + 1000}"
+    cache.set(_code_key(user_id), code, settings.OTP_TTL)
+    cache.delete(_attempts_key(user_id))
+    return code
+
+
+def verify_otp(user_id, code):
+    """
+    True if `code` is the user's current code. A code is consumed by a successful
+    check and discarded after OTP_MAX_VERIFY_ATTEMPTS wrong guesses.
+    """
+    expected = cache.get(_code_key(user_id))
+    if expected is None:
+        return False
+    if _increment(_attempts_key(user_id), settings.OTP_TTL) > settings.OTP_MAX_VERIFY_ATTEMPTS:
+        cache.delete(_code_key(user_id))
+        return False
+    if not secrets.compare_digest(str(code).encode(), expected.encode()):
+        return False
+    cache.delete_many([_code_key(user_id), _attempts_key(user_id), _sends_key(user_id)])
+    return True
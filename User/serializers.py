@@ -1,9 +1,7 @@
 from rest_framework import serializers
 from .models import UserModel
 from .utils import send_otp
-from datetime import datetime, timedelta
-import random
-from django.conf import settings
+from .otp import generate_otp
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,16 +13,9 @@ class UserSerializer(serializers.ModelSerializer):
    
 
     def create(self, validated_data):
-        otp = random.randint(1000, 9999)
-        otp_expiry = datetime.now() + timedelta(minutes=10)
-        user = UserModel(
-            phone_number=validated_data["phone_number"],
-            otp=otp,
-            otp_expiry=otp_expiry,
-            max_otp_try=settings.MAX_OTP_TRY,
-        )
+        user = UserModel(phone_number=validated_data["phone_number"])
         user.save()
-        send_otp(validated_data["phone_number"], otp)
+        send_otp(validated_data["phone_number"], generate_otp(user.pk))
         return user
 
 
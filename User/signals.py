@@ -0,0 +1,21 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache_key
+from .models import UserModel
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    cache.delete(token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=UserModel)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    """
+    Cached token lookups carry is_active and the staff flags; drop them so changes (is_active in particular) apply at once.
+    """
+    if not created:
+        cache.delete_many([token_cache_key(key) for key in Token.objects.filter(user=instance).values_list('key', flat=True)])
@@ -0,0 +1,17 @@
+from celery import shared_task
+
+from Turf_management.metrics import OTP_SMS
+from .sms import CircuitOpen, SmsError, get_gateway
+
+
+@shared_task(autoretry_for=(SmsError,), retry_backoff=2, retry_backoff_max=120, retry_jitter=True, max_retries=6)
+def send_sms(number, message):
+    try:
+        get_gateway().send(number, message)
+    except CircuitOpen:
+        OTP_SMS.labels('circuit_open').inc()
+        raise
+    except SmsError:
+        OTP_SMS.labels('failed').inc()
+        raise
+    OTP_SMS.labels('sent').inc()
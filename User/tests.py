@@ -1,3 +1,273 @@
-from django.test import TestCase
+import time
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+import requests
+from celery import Celery
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from kombu.exceptions import OperationalError
+from prometheus_client import REGISTRY
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from Turf_management.celery import app as celery_app
+from .authentication import CachedTokenAuthentication, get_token_user
+from .models import UserModel
+from .otp import OtpLocked, generate_otp, verify_otp
+from .sms import BulkSmsGateway, CircuitBreaker, CircuitOpen, SmsError, get_gateway
+from .tasks import send_sms
+from .utils import enqueue_sms, send_otp
+
+class OtpTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserModel.objects.create_user('01700000001')
+
+
+@override_settings(MAX_OTP_TRY=3, OTP_MAX_VERIFY_ATTEMPTS=2)
+class OtpLockoutTests(OtpTestCase):
+    def test_sends_are_locked_after_max_tries(self):
+        for _ in range(3):
+            generate_otp(self.user.pk)
+        with self.assertRaises(OtpLocked):
+            generate_otp(self.user.pk)
+
+    def test_lockout_is_per_user(self):
+        other = UserModel.objects.create_user('01700000002')
+        for _ in range(3):
+            generate_otp(self.user.pk)
+        generate_otp(other.pk)
+
+    def test_correct_code_is_consumed_and_resets_the_lockout(self):
+        for _ in range(2):
+            code = generate_otp(self.user.pk)
+        self.assertTrue(verify_otp(self.user.pk, code))
+        self.assertFalse(verify_otp(self.user.pk, code))
+        for _ in range(3):
+            generate_otp(self.user.pk)
+
+    def test_only_the_latest_code_is_valid(self):
+        old = generate_otp(self.user.pk)
+        new = generate_otp(self.user.pk)
+        if old != new:
+            self.assertFalse(verify_otp(self.user.pk, old))
+        self.assertTrue(verify_otp(self.user.pk, new))
+
+    def test_code_is_discarded_after_too_many_wrong_guesses(self):
+        code = generate_otp(self.user.pk)
+        wrong = '0000' if code != '0000' else '1111'
+        self.assertFalse(verify_otp(self.user.pk, wrong))
+        self.assertFalse(verify_otp(self.user.pk, wrong))
+        self.assertFalse(verify_otp(self.user.pk, code))
+
+
+class OtpViewTests(OtpTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_verify_otp_activates_the_user_once(self):
+        code = generate_otp(self.user.pk)
+        response = self.client.patch(f'/user/{self.user.pk}/verify_otp/', {'otp': code}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+        code = generate_otp(self.user.pk)
+        response = self.client.patch(f'/user/{self.user.pk}/verify_otp/', {'otp': code}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_verify_otp_rejects_a_wrong_code(self):
+        code = generate_otp(self.user.pk)
+        response = self.client.patch(f'/user/{self.user.pk}/verify_otp/', {'otp': 'x' + code}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    def test_generate_otp_is_refused_once_locked(self):
+        with self.settings(MAX_OTP_TRY=1):
+            self.assertEqual(self.client.patch(f'/user/{self.user.pk}/generate_otp/').status_code, 200)
+            self.assertEqual(self.client.patch(f'/user/{self.user.pk}/generate_otp/').status_code, 400)
+
+
+class TokenUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserModel.objects.create_user('01700000001', 'secret')
+        self.user.is_active = True
+        self.user.name = 'Rahim'
+        self.user.save()
+        self.token = Token.objects.create(user=self.user)
+
+    def test_cache_holds_no_password(self):
+        user = get_token_user(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertNotIn('password', user.__dict__)
+        # Deferred fields load on access
+        self.assertEqual(user.name, 'Rahim')
+        self.assertTrue(user.check_password('secret'))
+
+    def test_deactivation_and_logout_apply_at_once(self):
+        self.assertIsNotNone(get_token_user(self.token.key))
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(get_token_user(self.token.key))
+        UserModel.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.assertIsNotNone(get_token_user(self.token.key))
+        self.token.delete()
+        self.assertIsNone(get_token_user(self.token.key))
+
+    def test_rest_requests_ignore_query_string_tokens(self):
+        factory = APIRequestFactory()
+        authentication = CachedTokenAuthentication()
+        request = Request(factory.get('/turfs/', {'token': self.token.key}))
+        self.assertIsNone(authentication.authenticate(request))
+        request = Request(factory.get('/turfs/', HTTP_AUTHORIZATION=f'Token {self.token.key}'))
+        self.assertEqual(authentication.authenticate(request)[0].pk, self.user.pk)
+
+
+@contextmanager
+def unreachable_broker():
+    """
+    Publish tasks to a closed local port through a fresh producer pool.
+    """
+    def connection_for_write(url=None, **kwargs):
+        return Celery.connection_for_write(celery_app, 'redis://127.0.0.1:1/0', **kwargs)
+
+    with mock.patch.object(celery_app, 'connection_for_write', connection_for_write), \
+            mock.patch.object(celery_app.amqp, '_producer_pool', None):
+        yield
+
+
+class FailingGateway:
+    def __init__(self, error=SmsError):
+        self.error = error
+        self.calls = 0
+
+    def send(self, number, message):
+        self.calls += 1
+        raise self.error("gateway down")
+
+
+class OpenCircuitGateway(FailingGateway):
+    def __init__(self):
+        super().__init__(CircuitOpen)
+
+
+class SmsTestCase(TestCase):
+    def sent(self, result):
+        return REGISTRY.get_sample_value('otp_sms_total', {'result': result}) or 0
+
+
+class CircuitBreakerTests(SmsTestCase):
+    def test_opens_after_consecutive_failures_and_lets_one_trial_through(self):
+        with mock.patch('User.sms.time.monotonic', return_value=100.0) as monotonic:
+            breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+
+            monotonic.return_value = 161.0
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            # A failed trial opens the circuit again for a full reset_timeout
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+
+            monotonic.return_value = 222.0
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertTrue(breaker.allow())
+            self.assertTrue(breaker.allow())
+
+    def test_success_resets_the_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+
+
+@override_settings(SMS_CIRCUIT_FAILURES=2, SMS_CIRCUIT_RESET=60)
+class BulkSmsGatewayTests(SmsTestCase):
+    def test_sends_a_form_encoded_get_with_timeouts(self):
+        gateway = BulkSmsGateway()
+        with mock.patch.object(gateway.session, 'get', return_value=mock.Mock(ok=True)) as get:
+            gateway.send('01700000001', 'MangoIT OTP is 1234')
+        get.assert_called_once_with(
+            BulkSmsGateway.url,
+            data={'api_key': settings.SMS_API_KEY, 'senderid': BulkSmsGateway.sender_id,
+                  'number': '01700000001', 'message': 'MangoIT OTP is 1234'},
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+            timeout=settings.SMS_TIMEOUT,
+        )
+
+    def test_failures_open_the_circuit(self):
+        gateway = BulkSmsGateway()
+        with mock.patch.object(gateway.session, 'get', side_effect=requests.ConnectionError) as get:
+            for _ in range(2):
+                with self.assertRaises(SmsError):
+                    gateway.send('01700000001', 'hello')
+            with self.assertRaises(CircuitOpen):
+                gateway.send('01700000001', 'hello')
+        self.assertEqual(get.call_count, 2)
+
+    def test_error_status_counts_as_a_failure(self):
+        gateway = BulkSmsGateway()
+        with mock.patch.object(gateway.session, 'get', return_value=mock.Mock(ok=False, status_code=503)):
+            with self.assertRaisesMessage(SmsError, '503'):
+                gateway.send('01700000001', 'hello')
+
+
+class SendSmsTaskTests(SmsTestCase):
+    @override_settings(SMS_GATEWAY='User.sms.FakeSmsGateway')
+    def test_delivers_through_the_gateway(self):
+        before = self.sent('sent')
+        result = send_sms.apply(('01700000001', 'MangoIT OTP is 1234'))
+        self.assertTrue(result.successful())
+        self.assertEqual(get_gateway().outbox, [('01700000001', 'MangoIT OTP is 1234')])
+        self.assertEqual(self.sent('sent'), before + 1)
+
+    @override_settings(SMS_GATEWAY='User.tests.FailingGateway')
+    def test_failures_are_retried_then_given_up(self):
+        before = self.sent('failed')
+        result = send_sms.apply(('01700000001', 'hello'))
+        self.assertTrue(result.failed())
+        self.assertIsInstance(result.result, SmsError)
+        self.assertEqual(get_gateway().calls, send_sms.max_retries + 1)
+        self.assertEqual(self.sent('failed'), before + send_sms.max_retries + 1)
+
+    @override_settings(SMS_GATEWAY='User.tests.OpenCircuitGateway')
+    def test_open_circuit_is_counted_separately(self):
+        before = self.sent('circuit_open'), self.sent('failed')
+        send_sms.apply(('01700000001', 'hello'))
+        self.assertEqual(self.sent('circuit_open'), before[0] + send_sms.max_retries + 1)
+        self.assertEqual(self.sent('failed'), before[1])
+
+    @override_settings(SMS_GATEWAY='User.sms.FakeSmsGateway')
+    def test_otp_is_queued_after_commit(self):
+        with mock.patch.object(send_sms, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                send_otp('01700000001', '1234')
+                apply_async.assert_not_called()
+        apply_async.assert_called_once_with(('01700000001', 'MangoIT OTP is 1234'), retry=False)
+
+    def test_broker_errors_do_not_fail_the_request(self):
+        before = self.sent('queue_failed')
+        with mock.patch.object(send_sms, 'apply_async', side_effect=OperationalError('broker down')), \
+                self.assertLogs('User.utils', 'ERROR'):
+            enqueue_sms('01700000001', 'hello')
+        self.assertEqual(self.sent('queue_failed'), before + 1)
+
+    def test_unreachable_broker_does_not_block_the_request(self):
+        before = self.sent('queue_failed')
+        with unreachable_broker(), self.assertLogs('User.utils', 'ERROR'):
+            started = time.monotonic()
+            with self.captureOnCommitCallbacks(execute=True):
+                send_otp('01700000001', '1234')
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.sent('queue_failed'), before + 1)
@@ -1,19 +1,25 @@
-import requests
-from django.conf import settings
+import logging
+
+from django.db import transaction
+
+from Turf_management.metrics import OTP_SMS
+from .tasks import send_sms
+
+logger = logging.getLogger(__name__)
 
 
 def send_otp(mobile, otp):
-    url = "http://bulksmsbd.net/api/smsapi"
+    """
+    Queue the OTP SMS once the surrounding transaction commits; delivery and
+    retries happen in the Celery worker, so the request does not wait on the gateway.
+    """
     message = f"MangoIT OTP is {otp}"
-    payload = {
-        "api_key": settings.SMS_API_KEY,
-        "senderid": "8809617620100",  # Update with your actual sender ID
-        "number": mobile,
-        "message": message
-    }
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-    }
-    
-    response = requests.get(url, data=payload, headers=headers)
-    return bool(response.ok)
+    transaction.on_commit(lambda: enqueue_sms(mobile, message))
+
+
+def enqueue_sms(number, message):
+    try:
+        send_sms.apply_async((number, message), retry=False)
+    except Exception as e:
+        OTP_SMS.labels('queue_failed').inc()
+        logger.error(f"Could not queue SMS to {number}: {e}")